@@ -1,9 +1,9 @@
 import discord
 import yaml
-import aiosqlite
 import re
 from discord import app_commands
 from discord.ext import commands
+from cogs.functions.repository import add_embed, delete_embed, get_embed, get_embeds
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -104,19 +104,10 @@ class EmbedCreator(discord.ui.View):
 
     @discord.ui.button(label='Save Embed', style=discord.ButtonStyle.green, custom_id='embed_creator:save')
     async def save_embed_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect("database.db") as db:
-            await db.execute(
-                """
-                INSERT INTO embeds (title, description, author, footer, author_image, 
-                thumbnail_image, large_image, footer_image, embed_color)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    self.title, self.description, self.author, self.footer,
-                    self.author_image, self.thumbnail_image, self.large_image, self.footer_image, self.embed_color
-                )
-            )
-            await db.commit()
+        await add_embed(
+            self.title, self.description, self.author, self.footer,
+            self.author_image, self.thumbnail_image, self.large_image, self.footer_image, self.embed_color
+        )
 
         await interaction.response.send_message("✅ Embed saved successfully!", ephemeral=True)
 
@@ -153,24 +144,22 @@ class EmbedCog(commands.GroupCog, name="embed"):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM embeds WHERE id = ?", (embed_id,))
-            embed_data = await cursor.fetchone()
+        embed_data = await get_embed(embed_id)
 
         if not embed_data:
             await interaction.response.send_message("❌ Embed not found.", ephemeral=True)
             return
 
-        embed = discord.Embed(title=embed_data[1], description=embed_data[2], color=discord.Color.from_str(embed_data[9]))
+        embed = discord.Embed(title=embed_data.title, description=embed_data.description, color=discord.Color.from_str(embed_data.embed_color))
 
-        if embed_data[3]:
-            embed.set_author(name=embed_data[3], icon_url=embed_data[5])
-        if embed_data[4]:
-            embed.set_footer(text=embed_data[4], icon_url=embed_data[8])
-        if embed_data[6]:
-            embed.set_thumbnail(url=embed_data[6])
-        if embed_data[7]:
-            embed.set_image(url=embed_data[7])
+        if embed_data.author:
+            embed.set_author(name=embed_data.author, icon_url=embed_data.author_image)
+        if embed_data.footer:
+            embed.set_footer(text=embed_data.footer, icon_url=embed_data.footer_image)
+        if embed_data.thumbnail_image:
+            embed.set_thumbnail(url=embed_data.thumbnail_image)
+        if embed_data.large_image:
+            embed.set_image(url=embed_data.large_image)
 
         await interaction.channel.send(embed=embed)
         await interaction.response.send_message("✅ Embed posted!", ephemeral=True)
@@ -182,15 +171,13 @@ class EmbedCog(commands.GroupCog, name="embed"):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT id, title FROM embeds")
-            embeds = await cursor.fetchall()
+        embeds = await get_embeds()
 
         if not embeds:
             await interaction.response.send_message("❌ No stored embeds found.", ephemeral=True)
             return
 
-        embed_list = "\n".join([f"**ID {embed[0]}**: {embed[1] or 'Untitled'}" for embed in embeds])
+        embed_list = "\n".join([f"**ID {embed.id}**: {embed.title or 'Untitled'}" for embed in embeds])
         await interaction.response.send_message(f"📋 **Stored Embeds:**\n{embed_list}", ephemeral=True)
 
     @app_commands.command(name="edit", description="Edits an existing message with a stored embed")
@@ -206,24 +193,22 @@ class EmbedCog(commands.GroupCog, name="embed"):
             await interaction.response.send_message("❌ Message not found.", ephemeral=True)
             return
 
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM embeds WHERE id = ?", (embed_id,))
-            embed_data = await cursor.fetchone()
+        embed_data = await get_embed(embed_id)
 
         if not embed_data:
             await interaction.response.send_message("❌ Embed not found.", ephemeral=True)
             return
 
-        embed = discord.Embed(title=embed_data[1], description=embed_data[2], color=discord.Color.from_str(embed_data[9]))
+        embed = discord.Embed(title=embed_data.title, description=embed_data.description, color=discord.Color.from_str(embed_data.embed_color))
 
-        if embed_data[3]:
-            embed.set_author(name=embed_data[3], icon_url=embed_data[5])
-        if embed_data[4]:
-            embed.set_footer(text=embed_data[4], icon_url=embed_data[8])
-        if embed_data[6]:
-            embed.set_thumbnail(url=embed_data[6])
-        if embed_data[7]:
-            embed.set_image(url=embed_data[7])
+        if embed_data.author:
+            embed.set_author(name=embed_data.author, icon_url=embed_data.author_image)
+        if embed_data.footer:
+            embed.set_footer(text=embed_data.footer, icon_url=embed_data.footer_image)
+        if embed_data.thumbnail_image:
+            embed.set_thumbnail(url=embed_data.thumbnail_image)
+        if embed_data.large_image:
+            embed.set_image(url=embed_data.large_image)
 
         await message.edit(embed=embed)
         await interaction.response.send_message("✅ Embed updated successfully!", ephemeral=True)
@@ -246,16 +231,9 @@ class EmbedCog(commands.GroupCog, name="embed"):
                 return
 
         if embed_id:
-            async with aiosqlite.connect("database.db") as db:
-                cursor = await db.execute("SELECT * FROM embeds WHERE id = ?", (embed_id,))
-                embed_data = await cursor.fetchone()
-
-                if not embed_data:
-                    await interaction.response.send_message("❌ Embed not found.", ephemeral=True)
-                    return
-
-                await db.execute("DELETE FROM embeds WHERE id = ?", (embed_id,))
-                await db.commit()
+            if not await delete_embed(embed_id):
+                await interaction.response.send_message("❌ Embed not found.", ephemeral=True)
+                return
 
             await interaction.response.send_message("✅ Embed deleted successfully!", ephemeral=True)
         else:
@@ -1,31 +1,27 @@
 import discord
-import paypalrestsdk
-import aiosqlite
+import aiohttp
 import asyncio
 import yaml
+import time
 from discord import app_commands
 from discord.ext import commands, tasks
 from datetime import datetime
 from typing import Optional
-from cogs.functions.utils import create_invoice
+from cogs.functions.paypal import PayPalError, paypal
+from cogs.functions.poller import InvoicePoller, next_interval, reconcile_enabled, reconcile_interval
+from cogs.functions.utils import create_invoice, invoice_request_id
+from cogs.functions.webhook import WebhookServer, webhook_enabled
+from cogs.functions.repository import add_invoice, count_channel_invoices, get_commission, get_failed_invoices, get_invoice_by_paypal_id, mark_invoice_paid, requeue_invoice, set_invoice_state
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
 
 guild_id = data["General"]["GUILD_ID"]
 embed_color = data["General"]["EMBED_COLOR"]
-paypal_client_id = data["Invoice"]["PAYPAL_CLIENT_ID"]
-paypal_client_secret = data["Invoice"]["PAYPAL_CLIENT_SECRET"]
 invoice_roles = data["Permissions"].get("INVOICE_ROLES", [])
 commissions = data["Commissions"]
-
-my_api = paypalrestsdk.Api(
-    {
-        'mode': 'live',
-        'client_id': paypal_client_id,
-        'client_secret': paypal_client_secret
-    }
-)
+poll_tick = data["Invoice"].get("POLL_TICK", 1)
+invoice_max_attempts = data["Invoice"].get("MAX_ATTEMPTS", 5)
 
 class PayPalLink(discord.ui.View):
     def __init__(self, id):
@@ -35,51 +31,178 @@ class PayPalLink(discord.ui.View):
 class InvoiceCog(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        self.poller = InvoicePoller(self.check_invoice)
+        self.webhook = WebhookServer(self.handle_webhook) if webhook_enabled else None
+        self.webhook_task = None
+        self.discord_calls_saved = 0
+        self.creating = {}
+        self.channel_locks = {}
+        self.background = set()
 
-    def cog_load(self):
-        self.paypal_loop.start()
+    async def cog_load(self):
+        await self.poller.load()
 
-    @tasks.loop(seconds = 10)
-    async def paypal_loop(self):
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute('SELECT * FROM invoices')
-            invoices = await cursor.fetchall()
+        if reconcile_enabled:
+            self.reconcile_loop.start()
+        else:
+            self.paypal_loop.start()
 
-            for invoice in invoices:
-                try:
-                    channel = self.bot.get_channel(invoice[0])
+        if self.webhook:
+            self.webhook_task = asyncio.create_task(self.start_webhook())
 
-                    partialmessage = channel.get_partial_message(invoice[1])
+    async def cog_unload(self):
+        self.paypal_loop.cancel()
+        self.reconcile_loop.cancel()
 
-                    message = await channel.fetch_message(partialmessage.id)
+        if self.webhook:
+            self.webhook_task.cancel()
+            await self.webhook.close()
 
-                    payment = paypalrestsdk.Invoice.find(f"{invoice[2]}", api=my_api)
+    async def start_webhook(self):
+        # A payment can only be announced once the channels are cached, until then PayPal keeps
+        # the events and delivers them again.
+        await self.bot.wait_until_ready()
 
-                    status = payment['status']
+        try:
+            await self.webhook.start()
+        except OSError as error:
+            print(f'Failed to start the PayPal webhook server, relying on polling: {error}')
 
-                    if status == "PAID" or status == "MARKED_AS_PAID":
-                        await db.execute('UPDATE commissions SET amount = amount + ? WHERE channel_id = ?', (invoice[3], invoice[0]))
-                        await db.execute('DELETE FROM invoices WHERE message_id=?', (invoice[1],))
+    async def check_invoice(self, invoice, status: str = None) -> bool:
+        channel = self.bot.get_channel(invoice.channel_id)
 
-                        embed = discord.Embed(title="Invoice - Paid", description="✔ - Thank you for making the Payment! We can now begin the commission!", colour=discord.Color.from_str(embed_color))
-                        embed.add_field(name="Amount Paid", value=f"${invoice[3]}", inline=True)
-                        embed.add_field(name="Invoice ID", value=f"{invoice[2]}", inline=True)
-                        embed.set_thumbnail(url="https://media.discordapp.net/attachments/964703100839555092/1339635097418207296/Eo_circle_orange_checkmark.svg.png?ex=67af6fe8&is=67ae1e68&hm=405de4ac3529d8f925950208292b2d530bcf1084577966cb27aebbc2c32b37ab&=&format=webp&quality=lossless&width=532&height=532")
-                        embed.set_footer(text="Orchard Studios")
-                        embed.timestamp = datetime.now()
-                        
-                        msg = await message.edit(embed=embed, attachments=message.attachments)
+        if not channel:
+            await set_invoice_state(invoice, "cancelled", "The ticket channel no longer exists.")
+            return True
 
-                        embed = discord.Embed(title="Invoice Payment Successful", description=f"Successfully received the paypal for this [invoice]({msg.jump_url}) (**${invoice[3]}**).", color=discord.Color.from_str(embed_color))
-                        await channel.send(embed=embed)
-                    else:
-                        continue
-                except:
-                    await db.execute('DELETE FROM invoices WHERE message_id=?', (invoice[1],))
-            
-            await db.commit()
+        if status is None and invoice.state == "created":
+            return await self.send_invoice(invoice)
+
+        if status is None:
+            # The invoice message is never fetched just to be checked, it's only edited (without a
+            # fetch) once the invoice is paid.
+            self.discord_calls_saved += 1
+
+            try:
+                payment = await paypal.find_invoice(f"{invoice.invoice_id}")
+
+                status = payment['status']
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                return await self.record_failure(invoice, error, transient=True)
+            except PayPalError as error:
+                return await self.record_failure(invoice, error, transient=error.transient)
+            except Exception as error:
+                return await self.record_failure(invoice, error)
+
+        if status == "PAID" or status == "MARKED_AS_PAID":
+            await self.complete_payment(invoice, channel)
+            return True
+
+        if status == "CANCELLED":
+            await set_invoice_state(invoice, "cancelled")
+            return True
+
+        invoice.state = "polling"
+        invoice.attempts = 0
+        invoice.last_error = None
+
+        return False
+
+    async def send_invoice(self, invoice) -> bool:
+        try:
+            await paypal.send_invoice(f"{invoice.invoice_id}", request_id=f"send-{invoice.invoice_id}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return await self.record_failure(invoice, error, transient=True)
+        except PayPalError as error:
+            return await self.record_failure(invoice, error, transient=error.transient)
+
+        if invoice.state == "created":
+            invoice.attempts = 0
+            await set_invoice_state(invoice, "sent")
+
+        return False
+
+    async def record_failure(self, invoice, error: Exception, transient: bool = False) -> bool:
+        invoice.last_error = f"{type(error).__name__}: {error}"[:500]
+
+        # PayPal being slow or briefly down never counts against an invoice, it's just checked
+        # again later. Anything else is retried a few times before staff have to look at it.
+        if transient:
+            return False
+
+        invoice.attempts += 1
+        if invoice.attempts < invoice_max_attempts:
+            return False
+
+        await set_invoice_state(invoice, "failed", invoice.last_error)
+        return True
+
+    async def complete_payment(self, invoice, channel: discord.TextChannel = None):
+        # Shared by the poller and the webhook, whichever sees the payment first does the work.
+        if not await mark_invoice_paid(invoice):
+            return
+
+        self.poller.remove(invoice.message_id)
+
+        channel = channel or self.bot.get_channel(invoice.channel_id)
+
+        # The payment and the commission credit are already saved, a failed announcement is only
+        # recorded on the invoice. Raising here would make a redelivered webhook skip it for good.
+        if not channel:
+            await set_invoice_state(invoice, "paid", "Failed to announce the payment: the ticket channel no longer exists.")
+            return
+
+        try:
+            await self.announce_payment(invoice, channel)
+        except discord.HTTPException as error:
+            await set_invoice_state(invoice, "paid", f"Failed to announce the payment: {error}")
+
+    async def announce_payment(self, invoice, channel: discord.TextChannel):
+        message = channel.get_partial_message(invoice.message_id)
+
+        embed = discord.Embed(title="Invoice - Paid", description="✔ - Thank you for making the Payment! We can now begin the commission!", colour=discord.Color.from_str(embed_color))
+        embed.add_field(name="Amount Paid", value=f"${invoice.amount}", inline=True)
+        embed.add_field(name="Invoice ID", value=f"{invoice.invoice_id}", inline=True)
+        embed.set_thumbnail(url="https://media.discordapp.net/attachments/964703100839555092/1339635097418207296/Eo_circle_orange_checkmark.svg.png?ex=67af6fe8&is=67ae1e68&hm=405de4ac3529d8f925950208292b2d530bcf1084577966cb27aebbc2c32b37ab&=&format=webp&quality=lossless&width=532&height=532")
+        embed.set_footer(text="Orchard Studios")
+        embed.timestamp = datetime.now()
+        
+        msg = await message.edit(embed=embed)
+
+        embed = discord.Embed(title="Invoice Payment Successful", description=f"Successfully received the paypal for this [invoice]({msg.jump_url}) (**${invoice.amount}**).", color=discord.Color.from_str(embed_color))
+        await channel.send(embed=embed)
+
+    async def handle_webhook(self, event: dict):
+        if event.get("event_type") != "INVOICING.INVOICE.PAID":
+            return
+
+        resource = event.get("resource", {})
+        invoice = await get_invoice_by_paypal_id(resource.get("invoice", resource).get("id"))
+
+        # Already paid through the poller or an earlier delivery of the same event.
+        if not invoice:
+            return
+
+        await self.complete_payment(invoice)
+
+    @tasks.loop(seconds = poll_tick)
+    async def paypal_loop(self):
+        # tasks.loop only survives network errors, anything else (a locked database) would stop
+        # polling until the bot restarts.
+        try:
+            await self.poller.tick()
+        except Exception as error:
+            print(f'Invoice polling failed, retrying next tick: {error}')
+
+    @tasks.loop(seconds = reconcile_interval)
+    async def reconcile_loop(self):
+        try:
+            await self.poller.reconcile()
+        except Exception as error:
+            print(f'Invoice reconciliation failed, retrying next cycle: {error}')
 
     @paypal_loop.before_loop
+    @reconcile_loop.before_loop
     async def before_paypal_loop(self):
         await self.bot.wait_until_ready()
 
@@ -98,56 +221,117 @@ class InvoiceCog(commands.Cog):
         
         await interaction.response.defer(thinking=True)
 
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-            commission_data = await cursor.fetchone()
+        commission_data = await get_commission(interaction.channel.id)
             
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
             
-            if not commission_data[5]:
-                embed = discord.Embed(title="Error", description="This commission has no freelancer!", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        if not commission_data.freelancer_id:
+            embed = discord.Embed(title="Error", description="This commission has no freelancer!", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
             
-            freelancer = interaction.guild.get_member(commission_data[5])
-            if not freelancer:
-                embed = discord.Embed(title="Error", description="The freelancer for this commission is not in the server.", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        freelancer = interaction.guild.get_member(commission_data.freelancer_id)
+        if not freelancer:
+            embed = discord.Embed(title="Error", description="The freelancer for this commission is not in the server.", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
             
-            department = next((c["department"] for c in commissions if c["channel"] == commission_data[2]), None)
-            if not department:
-                embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
-                embed.set_footer(text="Failed to find department")
+        department = next((c["department"] for c in commissions if c["channel"] == commission_data.freelancer_channel_id), None)
+        if not department:
+            embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
+            embed.set_footer(text="Failed to find department")
+            await interaction.followup.send(embed=embed)
+            return
+
+        # A double click, PayPal would hand back the same invoice so there is nothing to post twice.
+        # If the first create failed this one tries again.
+        key = (interaction.channel.id, amount)
+        while key in self.creating:
+            if await asyncio.shield(self.creating[key]):
+                embed = discord.Embed(title="Error", description="An invoice for this amount was just created in this channel.", color=discord.Color.red())
                 await interaction.followup.send(embed=embed)
                 return
 
-            response = await create_invoice(my_api, amount, department, freelancer, interaction.channel, email)
-            if not response:
-                embed = discord.Embed(title="Error", description="An error occurred while creating the invoice.", color=discord.Color.from_str(embed_color))
-                embed.set_footer(text="Deleting in 10 seconds")
+        self.creating[key] = asyncio.get_running_loop().create_future()
+        invoice = None
+
+        try:
+            # The request id comes from the channel's invoice count, so counting, creating and saving
+            # happen under one lock per channel. Otherwise two clicks could read the same count and
+            # save the same PayPal invoice twice.
+            async with self.channel_locks.setdefault(interaction.channel.id, asyncio.Lock()):
+                request_id = invoice_request_id(interaction.channel.id, amount, await count_channel_invoices(interaction.channel.id))
+                response = await create_invoice(amount, department, freelancer, interaction.channel, email, request_id)
+
+                if response:
+                    embed = discord.Embed(title="**Invoice - Unpaid **", description="⌛ - Invoice has yet to be paid \n\nPlease remember all LIVE work requires 100% of the payment upfront.", colour=discord.Color.from_str(embed_color))
+                    embed.add_field(name="Amount Due", value=f"${amount}", inline=True)
+                    embed.add_field(name="Invoice ID", value=f"{response}", inline=True)
+                    embed.set_thumbnail(url="https://media.discordapp.net/attachments/964703100839555092/1339634022791516272/8531200.png?ex=67af6ee8&is=67ae1d68&hm=c21f546117e5245f31577ef6d00dd25d88a6980ec8a2ddc423c424ed4996d6b1&=&format=webp&quality=lossless")
+                    embed.set_footer(text="Orchard Studios")
+                    embed.timestamp = datetime.now()
+
+                    msg = await interaction.followup.send(embed=embed, view=PayPalLink(response), wait=True)
+
+                    invoice = await add_invoice(interaction.channel.id, msg.id, response, amount, time.time() + next_interval(0), state="created")
+                    self.poller.add(invoice)
+        finally:
+            # Only an invoice that was posted and saved stops a second click from trying again.
+            self.creating.pop(key).set_result(invoice)
+
+        if not response:
+            embed = discord.Embed(title="Error", description="An error occurred while creating the invoice.", color=discord.Color.from_str(embed_color))
+            embed.set_footer(text="Deleting in 10 seconds")
+            msg = await interaction.followup.send(embed=embed, wait=True)
+            await asyncio.sleep(10)
+            await msg.delete()
+            return
+
+        # Sending is the second PayPal call, it happens after the reply. If it fails the poller
+        # sends the invoice again on its next check.
+        task = asyncio.create_task(self.send_invoice(invoice))
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    @app_commands.command(name="failedinvoices", description="Lists invoices that could not be checked and retries them")
+    @app_commands.describe(retry="The ID of a failed invoice to start checking again")
+    async def failedinvoices(self, interaction: discord.Interaction, retry: Optional[str]) -> None:
+        if not await self.check_permissions(interaction):
+            embed = discord.Embed(title="No Permission", description="You do not have permission to use this command.", color=discord.Color.red())
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        if retry:
+            invoice = await requeue_invoice(retry.strip(), time.time())
+
+            if not invoice:
+                embed = discord.Embed(title="Error", description=f"There is no failed invoice with the ID `{retry}`.", color=discord.Color.red())
                 await interaction.followup.send(embed=embed)
-                msg = await interaction.original_response()
-                await asyncio.sleep(10)
-                await msg.delete()
                 return
-            
-            async with aiosqlite.connect('database.db') as db:
-                embed = discord.Embed(title="**Invoice - Unpaid **", description="⌛ - Invoice has yet to be paid \n\nPlease remember all LIVE work requires 100% of the payment upfront.", colour=discord.Color.from_str(embed_color))
-                embed.add_field(name="Amount Due", value=f"${amount}", inline=True)
-                embed.add_field(name="Invoice ID", value=f"{response}", inline=True)
-                embed.set_thumbnail(url="https://media.discordapp.net/attachments/964703100839555092/1339634022791516272/8531200.png?ex=67af6ee8&is=67ae1d68&hm=c21f546117e5245f31577ef6d00dd25d88a6980ec8a2ddc423c424ed4996d6b1&=&format=webp&quality=lossless")
-                embed.set_footer(text="Orchard Studios")
-                embed.timestamp = datetime.now()
-
-                await interaction.followup.send(embed=embed, view=PayPalLink(response))
-                msg = await interaction.original_response()
-
-                await db.execute('INSERT INTO invoices VALUES (?,?,?,?);', (interaction.channel.id, msg.id, response, amount))
-                await db.commit()
+
+            self.poller.add(invoice)
+
+            embed = discord.Embed(title="Invoice Requeued", description=f"`{invoice.invoice_id}` in <#{invoice.channel_id}> will be checked again shortly.", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed)
+            return
+
+        invoices = await get_failed_invoices()
+
+        embed = discord.Embed(title="Failed Invoices", color=discord.Color.from_str(embed_color))
+
+        if not invoices:
+            embed.description = "There are no failed invoices."
+
+        for invoice in invoices:
+            embed.add_field(name=f"{invoice.invoice_id} (${invoice.amount})", value=f"**Channel:** <#{invoice.channel_id}>\n**Attempts:** {invoice.attempts}\n**Last Error:** `{(invoice.last_error or 'Unknown')[:200]}`", inline=False)
+
+        embed.set_footer(text="Use /failedinvoices retry:<invoice id> to check an invoice again")
+        await interaction.followup.send(embed=embed)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(InvoiceCog(bot))
\ No newline at end of file
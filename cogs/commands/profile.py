@@ -1,8 +1,8 @@
 import discord
-import aiosqlite
 import yaml
 from discord import app_commands
 from discord.ext import commands
+from cogs.functions.repository import get_profile, set_profile_field
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -28,34 +28,15 @@ class ProfileModal(discord.ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         user_input = self.text_input.value.strip()
 
-        async with aiosqlite.connect('database.db') as db:
-            await db.execute(
-                f"""
-                INSERT INTO profiles (member_id, {self.category_key})
-                VALUES (?, ?)
-                ON CONFLICT(member_id) DO UPDATE SET
-                    {self.category_key} = excluded.{self.category_key}
-                """,
-                (interaction.user.id, user_input)
-            )
-            await db.commit()
-
-        async with aiosqlite.connect('database.db') as db:
-            async with db.execute(
-                """
-                SELECT portfolio, timezone, built_by_bit, description
-                FROM profiles WHERE member_id = ?
-                """, (interaction.user.id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-
-        portfolio, timezone, built_by_bit, description = row if row else (None, None, None, None)
+        await set_profile_field(interaction.user.id, self.category_key, user_input)
+
+        profile = await get_profile(interaction.user.id)
 
         embed = discord.Embed(title=f"{interaction.user.name}'s Profile", color=discord.Color.from_str(embed_color))
-        embed.add_field(name="🌎 Portfolio", value=portfolio or "Not Set", inline=False)
-        embed.add_field(name="⏰ Timezone", value=timezone or "Not Set", inline=False)
-        embed.add_field(name="🏪 BuiltByBit", value=built_by_bit or "Not Set", inline=False)
-        embed.add_field(name="🧑‍💻 Description", value=description or "Not Set", inline=False)
+        embed.add_field(name="🌎 Portfolio", value=profile.portfolio or "Not Set", inline=False)
+        embed.add_field(name="⏰ Timezone", value=profile.timezone or "Not Set", inline=False)
+        embed.add_field(name="🏪 BuiltByBit", value=profile.built_by_bit or "Not Set", inline=False)
+        embed.add_field(name="🧑‍💻 Description", value=profile.description or "Not Set", inline=False)
         embed.set_thumbnail(url=interaction.user.display_avatar.url)
 
         await interaction.response.edit_message(embed=embed)
@@ -65,10 +46,8 @@ class ProfileButtons(discord.ui.View):
         super().__init__(timeout=None)
 
     async def open_modal(self, interaction: discord.Interaction, category_key: str):
-        async with aiosqlite.connect('database.db') as db:
-            async with db.execute("SELECT " + category_key + " FROM profiles WHERE member_id = ?", (interaction.user.id,)) as cursor:
-                row = await cursor.fetchone()
-                placeholder = row[0] if row else None
+        profile = await get_profile(interaction.user.id)
+        placeholder = getattr(profile, category_key) if profile else None
 
         await interaction.response.send_modal(ProfileModal(category_key, placeholder))
 
@@ -103,16 +82,9 @@ class ProfileCog(commands.Cog):
         if not member:
             member = interaction.user
 
-        async with aiosqlite.connect('database.db') as db:
-            async with db.execute(
-                """
-                SELECT portfolio, timezone, built_by_bit, description
-                FROM profiles WHERE member_id = ?
-                """, (member.id,)
-            ) as cursor:
-                row = await cursor.fetchone()
+        profile = await get_profile(member.id)
 
-        portfolio, timezone, built_by_bit, description = row if row else (None, None, None, None)
+        portfolio, timezone, built_by_bit, description = (profile.portfolio, profile.timezone, profile.built_by_bit, profile.description) if profile else (None, None, None, None)
 
         embed = discord.Embed(title=f"{member.name}'s Profile", color=discord.Color.from_str(embed_color))
         embed.add_field(name="🌎 Portfolio", value=portfolio or "Not Set", inline=False)
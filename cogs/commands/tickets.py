@@ -1,10 +1,15 @@
 import discord
-import aiosqlite
 import yaml
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime
 from cogs.functions.utils import close_ticket
+from cogs.functions.recorder import is_ticket_channel
+from cogs.functions.timers import inactivity_enabled, inactivity_hours
+from cogs.functions.repository import (
+    add_commission, add_question, add_quote, add_ticket, get_commission, get_commission_by_message, get_commission_with_profile,
+    get_question, get_quote_with_commission, get_quotes, get_ticket, set_commission_freelancer
+)
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -31,130 +36,118 @@ class ClientButtons(discord.ui.View):
     async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
 
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM quotes WHERE message_id = ?", (interaction.message.id,))
-            quote_data = await cursor.fetchone()
+        quote_data, commission_data = await get_quote_with_commission(interaction.message.id)
 
-            if not quote_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the quote data!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
-            
-            channel = interaction.client.get_channel(quote_data[1])
-            if not channel:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if not quote_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the quote data!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (channel.id,))
-            commission_data = await cursor.fetchone()
+        channel = interaction.client.get_channel(quote_data.channel_id)
+        if not channel:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            freelancer = interaction.guild.get_member(quote_data[3])
-            if not freelancer:
-                embed = discord.Embed(title="Error", description="❌ Could not find the freelancer!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        freelancer = interaction.guild.get_member(quote_data.freelancer_id)
+        if not freelancer:
+            embed = discord.Embed(title="Error", description="❌ Could not find the freelancer!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            await db.execute('UPDATE commissions SET freelancer_id = ? WHERE channel_id = ?', (freelancer.id, channel.id))
-            await db.commit()
+        await set_commission_freelancer(channel.id, freelancer.id)
             
-            view = ClientButtons()
-            view.accept.disabled = True
-            view.decline.disabled = True
+        view = ClientButtons()
+        view.accept.disabled = True
+        view.decline.disabled = True
 
-            embed = interaction.message.embeds[0]
-            embed.title = "Accepted Quote"
-            await interaction.message.edit(embed=embed, view=view)
+        embed = interaction.message.embeds[0]
+        embed.title = "Accepted Quote"
+        await interaction.message.edit(embed=embed, view=view)
             
-            await channel.set_permissions(freelancer,
-                send_messages=True,
-                read_messages=True,
-                add_reactions=True,
-                embed_links=True,
-                read_message_history=True,
-                external_emojis=True)
+        await channel.set_permissions(freelancer,
+            send_messages=True,
+            read_messages=True,
+            add_reactions=True,
+            embed_links=True,
+            read_message_history=True,
+            external_emojis=True)
             
-            try:
-                embed = discord.Embed(title="Quote Accepted", description=f"{freelancer.mention}, your quote for {channel.mention} has been accepted for **${quote_data[4]:.2f}**!", color=discord.Color.from_str(embed_color))
+        try:
+            embed = discord.Embed(title="Quote Accepted", description=f"{freelancer.mention}, your quote for {channel.mention} has been accepted for **${quote_data.amount:.2f}**!", color=discord.Color.from_str(embed_color))
                 
-                embed.set_footer(text=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
-                embed.set_thumbnail(url=freelancer.display_avatar.url)
+            embed.set_footer(text=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_thumbnail(url=freelancer.display_avatar.url)
 
-                embed.timestamp = datetime.now()
+            embed.timestamp = datetime.now()
 
-                await freelancer.send(embed=embed)
-            except discord.Forbidden:
-                pass
+            await freelancer.send(embed=embed)
+        except discord.Forbidden:
+            pass
 
-            cursor = await db.execute("SELECT * FROM quotes WHERE channel_id = ?", (channel.id,))
-            quotes = await cursor.fetchall()
+        quotes = await get_quotes(channel.id)
 
-            for quote in quotes:
-                if quote[2] == interaction.message.id:
-                    continue
+        for quote in quotes:
+            if quote.message_id == interaction.message.id:
+                continue
 
-                try:
-                    quote_message = await channel.fetch_message(quote[2])
-                    await quote_message.delete()
-                except:
-                    continue
+            try:
+                quote_message = await channel.fetch_message(quote.message_id)
+                await quote_message.delete()
+            except:
+                continue
             
-            freelancer_channel = interaction.client.get_channel(commission_data[2])
-            if freelancer_channel:
-                try:
-                    freelancer_message = await freelancer_channel.fetch_message(commission_data[3])
-                    await freelancer_message.delete()
-                except:
-                    pass
+        freelancer_channel = interaction.client.get_channel(commission_data.freelancer_channel_id)
+        if freelancer_channel:
+            try:
+                freelancer_message = await freelancer_channel.fetch_message(commission_data.freelancer_message_id)
+                await freelancer_message.delete()
+            except:
+                pass
             
-            embed = discord.Embed(title="Quote Accepted", description=f"{freelancer.mention} has been added to the commission!", color=discord.Color.from_str(embed_color))
-            await interaction.channel.send(embed=embed)
+        embed = discord.Embed(title="Quote Accepted", description=f"{freelancer.mention} has been added to the commission!", color=discord.Color.from_str(embed_color))
+        await interaction.channel.send(embed=embed)
 
     @discord.ui.button(label='Decline', emoji='❌', style=discord.ButtonStyle.gray, custom_id="client:decline")
     async def decline(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
 
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM quotes WHERE message_id = ?", (interaction.message.id,))
-            quote_data = await cursor.fetchone()
+        quote_data, commission_data = await get_quote_with_commission(interaction.message.id)
 
-            if not quote_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the quote data!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
-            
-            channel = interaction.client.get_channel(quote_data[1])
-            if not channel:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if not quote_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the quote data!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (channel.id,))
-            commission_data = await cursor.fetchone()
+        channel = interaction.client.get_channel(quote_data.channel_id)
+        if not channel:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            freelancer = interaction.guild.get_member(quote_data[3])
+        freelancer = interaction.guild.get_member(quote_data.freelancer_id)
             
-            if freelancer:
-                try:
-                    embed = discord.Embed(title="Quote Declined", description=f"{freelancer.mention}, your quote for {channel.mention} has been declined.", color=discord.Color.from_str(embed_color))
-                    await freelancer.send(embed=embed)
-                except discord.Forbidden:
-                    pass
+        if freelancer:
+            try:
+                embed = discord.Embed(title="Quote Declined", description=f"{freelancer.mention}, your quote for {channel.mention} has been declined.", color=discord.Color.from_str(embed_color))
+                await freelancer.send(embed=embed)
+            except discord.Forbidden:
+                pass
             
-            await interaction.message.delete()
+        await interaction.message.delete()
             
-            embed = discord.Embed(title="Quote Declined", description="The quote has been declined.", color=discord.Color.from_str(embed_color))
-            await interaction.followup.send(embed=embed, ephemeral=True)
+        embed = discord.Embed(title="Quote Declined", description="The quote has been declined.", color=discord.Color.from_str(embed_color))
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 class QuestionModal(discord.ui.Modal, title='Answer a Question'):
     def __init__(self):
@@ -167,50 +160,48 @@ class QuestionModal(discord.ui.Modal, title='Answer a Question'):
     )
 
     async def on_submit(self, interaction: discord.Interaction):
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM questions WHERE message_id = ?", (interaction.message.id,))
-            question_data = await cursor.fetchone()
+        question_data = await get_question(interaction.message.id)
 
-            if not question_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the question data!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not question_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the question data!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            freelancer = interaction.guild.get_member(question_data[3])
-            if not freelancer:
-                embed = discord.Embed(title="Error", description="❌ Could not find the freelancer!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        freelancer = interaction.guild.get_member(question_data.freelancer_id)
+        if not freelancer:
+            embed = discord.Embed(title="Error", description="❌ Could not find the freelancer!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            view = QuestionButtons()
-            view.reply.disabled = True
+        view = QuestionButtons()
+        view.reply.disabled = True
 
-            embed = interaction.message.embeds[0]
-            embed.title = f"Answered Question From {freelancer.name}"
+        embed = interaction.message.embeds[0]
+        embed.title = f"Answered Question From {freelancer.name}"
 
-            embed.clear_fields()
-            embed.add_field(name="Question", value=question_data[4], inline=True)
-            embed.add_field(name="Reply", value=self.reply.value, inline=True)
+        embed.clear_fields()
+        embed.add_field(name="Question", value=question_data.question, inline=True)
+        embed.add_field(name="Reply", value=self.reply.value, inline=True)
 
-            await interaction.message.edit(embed=embed, view=view)
+        await interaction.message.edit(embed=embed, view=view)
             
-            try:
-                embed = discord.Embed(title="New Reply", description=f"{freelancer.mention}, you have a new reply to your question!", color=discord.Color.from_str(embed_color))
-                embed.timestamp = datetime.now()
+        try:
+            embed = discord.Embed(title="New Reply", description=f"{freelancer.mention}, you have a new reply to your question!", color=discord.Color.from_str(embed_color))
+            embed.timestamp = datetime.now()
 
-                embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else None)
                 
-                embed.add_field(name="Question", value=question_data[4], inline=True)
-                embed.add_field(name="Reply", value=self.reply.value, inline=True)
+            embed.add_field(name="Question", value=question_data.question, inline=True)
+            embed.add_field(name="Reply", value=self.reply.value, inline=True)
 
-                embed.set_footer(text=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_footer(text=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
 
-                await freelancer.send(embed=embed)
-            except discord.Forbidden:
-                pass
+            await freelancer.send(embed=embed)
+        except discord.Forbidden:
+            pass
                 
-            embed = discord.Embed(title="Reply Sent", description="Your reply has been sent!", color=discord.Color.from_str(embed_color))
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed = discord.Embed(title="Reply Sent", description="Your reply has been sent!", color=discord.Color.from_str(embed_color))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 class QuestionButtons(discord.ui.View):
     def __init__(self):
@@ -218,21 +209,19 @@ class QuestionButtons(discord.ui.View):
 
     @discord.ui.button(label='Reply', emoji='❓', style=discord.ButtonStyle.gray, custom_id="question:reply")
     async def reply(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-            commission_data = await cursor.fetchone()
+        commission_data = await get_commission(interaction.channel.id)
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
             
-            if commission_data[4] != interaction.user.id:
-                embed = discord.Embed(title="Error", description="❌ You are not the creator of this commission!", color=discord.Color.from_str(embed_color))
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
+        if commission_data.creator_id != interaction.user.id:
+            embed = discord.Embed(title="Error", description="❌ You are not the creator of this commission!", color=discord.Color.from_str(embed_color))
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
         
-            await interaction.response.send_modal(QuestionModal())
+        await interaction.response.send_modal(QuestionModal())
 
 class FreelancerModals(discord.ui.Modal):
     def __init__(self, key: str):
@@ -264,114 +253,95 @@ class FreelancerModals(discord.ui.Modal):
             self.add_item(self.question)
 
     async def on_submit(self, interaction: discord.Interaction):
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE freelancer_message_id = ?", (interaction.message.id,))
-            commission_data = await cursor.fetchone()
+        commission_data, freelancer_data = await get_commission_with_profile(interaction.message.id, interaction.user.id)
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            channel = interaction.client.get_channel(commission_data[1])
-            if not channel:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        channel = interaction.client.get_channel(commission_data.channel_id)
+        if not channel:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission channel!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            role_id = None
-            for department in commissions:
-                if department['channel'] == commission_data[2]:
-                    role_id = department['role']
-                    break
+        role_id = None
+        for department in commissions:
+            if department['channel'] == commission_data.freelancer_channel_id:
+                role_id = department['role']
+                break
             
-            if not role_id:
-                embed = discord.Embed(title="Error", description="❌ Could not find the corresponding role!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not role_id:
+            embed = discord.Embed(title="Error", description="❌ Could not find the corresponding role!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
 
-            cursor = await db.execute("SELECT * FROM profiles WHERE member_id = ?", (interaction.user.id,))
-            freelancer_data = await cursor.fetchone()
+        if not freelancer_data:
+            embed = discord.Embed(title="Error", description="❌ You must have a profile to use this feature!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
 
-            if not freelancer_data:
-                embed = discord.Embed(title="Error", description="❌ You must have a profile to use this feature!", color=discord.Color.from_str(embed_color))
+        if self.key == "Quote":
+            try:
+                quote_amount = float(self.quote.value)
+            except ValueError:
+                embed = discord.Embed(title="Error", description="❌ Please enter a valid number for your quote!", color=discord.Color.from_str(embed_color))
                 await interaction.response.send_message(embed=embed, ephemeral=True)
                 return
-
-            if self.key == "Quote":
-                try:
-                    quote_amount = float(self.quote.value)
-                except ValueError:
-                    embed = discord.Embed(title="Error", description="❌ Please enter a valid number for your quote!", color=discord.Color.from_str(embed_color))
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                    return
                 
-                message_value = self.message.value
-                fee_amount = quote_amount * (fee / 100)
-                total_amount = quote_amount + fee_amount
-
-                embed = discord.Embed(title="New Quote", color=discord.Color.from_str(embed_color))
-                embed.timestamp = datetime.now()
-
-                embed.set_thumbnail(url=interaction.user.display_avatar.url)
-                embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
-
-                embed.add_field(name="Department", value=f"<@&{role_id}>", inline=True)
-                embed.add_field(name="Freelancer", value=f"{interaction.user.mention} (@{interaction.user.name})", inline=True)
-                embed.add_field(name="Portfolio", value=f"{freelancer_data[2] if freelancer_data[2] else 'N/A'}", inline=True)
-                embed.add_field(name="Timezone", value=f"{freelancer_data[3] if freelancer_data[3] else 'N/A'}", inline=True)
-                embed.add_field(name="BuiltByBit", value=f"{freelancer_data[4] if freelancer_data[4] else 'N/A'}", inline=True)
-                embed.add_field(name="Description", value=f"{freelancer_data[5] if freelancer_data[5] else 'N/A'}", inline=True)
-
-                embed.add_field(name="Quote Amount", value=f"${quote_amount:.2f}", inline=True)
-                embed.add_field(name=f"PayPal Fee ({fee:.2f}%)", value=f"${fee_amount:.2f}", inline=True)
-                embed.add_field(name="Total Amount", value=f"${total_amount:.2f}", inline=True)
+            message_value = self.message.value
+            fee_amount = quote_amount * (fee / 100)
+            total_amount = quote_amount + fee_amount
+
+            embed = discord.Embed(title="New Quote", color=discord.Color.from_str(embed_color))
+            embed.timestamp = datetime.now()
+
+            embed.set_thumbnail(url=interaction.user.display_avatar.url)
+            embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+
+            embed.add_field(name="Department", value=f"<@&{role_id}>", inline=True)
+            embed.add_field(name="Freelancer", value=f"{interaction.user.mention} (@{interaction.user.name})", inline=True)
+            embed.add_field(name="Portfolio", value=f"{freelancer_data.portfolio if freelancer_data.portfolio else 'N/A'}", inline=True)
+            embed.add_field(name="Timezone", value=f"{freelancer_data.timezone if freelancer_data.timezone else 'N/A'}", inline=True)
+            embed.add_field(name="BuiltByBit", value=f"{freelancer_data.built_by_bit if freelancer_data.built_by_bit else 'N/A'}", inline=True)
+            embed.add_field(name="Description", value=f"{freelancer_data.description if freelancer_data.description else 'N/A'}", inline=True)
+
+            embed.add_field(name="Quote Amount", value=f"${quote_amount:.2f}", inline=True)
+            embed.add_field(name=f"PayPal Fee ({fee:.2f}%)", value=f"${fee_amount:.2f}", inline=True)
+            embed.add_field(name="Total Amount", value=f"${total_amount:.2f}", inline=True)
                 
-                if message_value:
-                    embed.add_field(name="Message", value=message_value, inline=False)
+            if message_value:
+                embed.add_field(name="Message", value=message_value, inline=False)
                 
-                embed.set_footer(text="Use the buttons to interact with this quote.", icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_footer(text="Use the buttons to interact with this quote.", icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
 
-                msg = await channel.send(content=f"<@{commission_data[4]}>", embed=embed, view=ClientButtons())
+            msg = await channel.send(content=f"<@{commission_data.creator_id}>", embed=embed, view=ClientButtons())
 
-                await db.execute(
-                    """
-                    INSERT INTO quotes (channel_id, message_id, freelancer_id, amount)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (commission_data[1], msg.id, interaction.user.id, quote_amount)
-                )
-                await db.commit()
+            await add_quote(commission_data.channel_id, msg.id, interaction.user.id, quote_amount)
 
-                embed = discord.Embed(title="Quote Sent", description="Your quote has been sent!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+            embed = discord.Embed(title="Quote Sent", description="Your quote has been sent!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             
-            elif self.key == "Question":
-                question_value = self.question.value
+        elif self.key == "Question":
+            question_value = self.question.value
 
-                embed = discord.Embed(title=f"New Question From {interaction.user.name}", color=discord.Color.from_str(embed_color))
-                embed.timestamp = datetime.now()
+            embed = discord.Embed(title=f"New Question From {interaction.user.name}", color=discord.Color.from_str(embed_color))
+            embed.timestamp = datetime.now()
 
-                embed.set_thumbnail(url=interaction.user.display_avatar.url)
-                embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_thumbnail(url=interaction.user.display_avatar.url)
+            embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
 
-                embed.add_field(name="Question", value=question_value, inline=False)
+            embed.add_field(name="Question", value=question_value, inline=False)
 
-                embed.set_footer(text="Use the buttons to interact with this question.", icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+            embed.set_footer(text="Use the buttons to interact with this question.", icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
 
-                msg = await channel.send(content=f"<@{commission_data[4]}>", embed=embed, view=QuestionButtons())
+            msg = await channel.send(content=f"<@{commission_data.creator_id}>", embed=embed, view=QuestionButtons())
 
-                await db.execute(
-                    """
-                    INSERT INTO questions (channel_id, message_id, freelancer_id, question)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (commission_data[1], msg.id, interaction.user.id, question_value)
-                )
-                await db.commit()
+            await add_question(commission_data.channel_id, msg.id, interaction.user.id, question_value)
 
-                embed = discord.Embed(title="Question Sent", description="Your question has been sent!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+            embed = discord.Embed(title="Question Sent", description="Your question has been sent!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
 
 class FreelancerButtons(discord.ui.View):
     def __init__(self):
@@ -379,73 +349,69 @@ class FreelancerButtons(discord.ui.View):
 
     @discord.ui.button(label='Quote', emoji='💰', style=discord.ButtonStyle.red, custom_id="freelancer:quote")
     async def quote(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE freelancer_message_id = ?", (interaction.message.id,))
-            commission_data = await cursor.fetchone()
+        commission_data = await get_commission_by_message(interaction.message.id)
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            role_id = None
-            for department in commissions:
-                if department['channel'] == commission_data[2]:
-                    role_id = department['role']
-                    break
+        role_id = None
+        for department in commissions:
+            if department['channel'] == commission_data.freelancer_channel_id:
+                role_id = department['role']
+                break
             
-            if not role_id:
-                embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not role_id:
+            embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            role = interaction.guild.get_role(role_id)
-            if not role:
-                embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        role = interaction.guild.get_role(role_id)
+        if not role:
+            embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            if role not in interaction.user.roles:
-                embed = discord.Embed(title="Error", description=f"❌ You must have the {role.mention} role to send a quote!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if role not in interaction.user.roles:
+            embed = discord.Embed(title="Error", description=f"❌ You must have the {role.mention} role to send a quote!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
 
-            await interaction.response.send_modal(FreelancerModals("Quote"))
+        await interaction.response.send_modal(FreelancerModals("Quote"))
 
     @discord.ui.button(label='Ask Question', emoji='❓', style=discord.ButtonStyle.gray, custom_id="freelancer:question")
     async def question(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE freelancer_message_id = ?", (interaction.message.id,))
-            commission_data = await cursor.fetchone()
+        commission_data = await get_commission_by_message(interaction.message.id)
 
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="❌ Could not find the commission data!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            role_id = None
-            for department in commissions:
-                if department['channel'] == commission_data[2]:
-                    role_id = department['role']
-                    break
+        role_id = None
+        for department in commissions:
+            if department['channel'] == commission_data.freelancer_channel_id:
+                role_id = department['role']
+                break
             
-            if not role_id:
-                embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not role_id:
+            embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            role = interaction.guild.get_role(role_id)
-            if not role:
-                embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        role = interaction.guild.get_role(role_id)
+        if not role:
+            embed = discord.Embed(title="Error", description="❌ Could not find the role for this commission!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            if role not in interaction.user.roles:
-                embed = discord.Embed(title="Error", description=f"❌ You must have the {role.mention} role to ask a question!", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if role not in interaction.user.roles:
+            embed = discord.Embed(title="Error", description=f"❌ You must have the {role.mention} role to ask a question!", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
 
-            await interaction.response.send_modal(FreelancerModals("Question"))
+        await interaction.response.send_modal(FreelancerModals("Question"))
 
 class CommissionDropdown(discord.ui.Select):
     def __init__(self):
@@ -511,6 +477,7 @@ class TicketModal(discord.ui.Modal):
 
         username_prefix = interaction.user.name[:4].lower()
         ticket_channel = await category_channel.create_text_channel(f"{self.category_key.lower()}-{username_prefix}")
+        await add_ticket(ticket_channel.id, interaction.user.id, self.category_key)
 
         await ticket_channel.set_permissions(interaction.guild.default_role,
             send_messages=False,
@@ -539,7 +506,7 @@ class TicketModal(discord.ui.Modal):
         embed = discord.Embed(title="Ticket Creation", description=f"The ticket has been created at {ticket_channel.mention}!", color=discord.Color.from_str(embed_color))
         await interaction.edit_original_response(embed=embed)
 
-        embed = discord.Embed(description="Support will be with you shortly!\nThis ticket will close in 24 hours of inactivity.", color=discord.Color.from_str(embed_color))
+        embed = discord.Embed(description=f"Support will be with you shortly!\nThis ticket will close in {inactivity_hours} hours of inactivity." if inactivity_enabled else "Support will be with you shortly!", color=discord.Color.from_str(embed_color))
         embed.set_footer(text="Close this ticket by clicking the 🔒 button.")
 
         responses = "\n".join([f"**{label}**: {field.value}" for label, field in self.inputs.items()])
@@ -577,15 +544,7 @@ class TicketModal(discord.ui.Modal):
             
             freelancer_message = await commission_channel.send(content=selected_role.mention, embed=embed, view=FreelancerButtons())
 
-            async with aiosqlite.connect('database.db') as db:
-                await db.execute(
-                    """
-                    INSERT INTO commissions (channel_id, freelancer_channel_id, freelancer_message_id, creator_id)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (ticket_channel.id, commission_channel.id, freelancer_message.id, interaction.user.id)
-                )
-                await db.commit()
+            await add_commission(ticket_channel.id, commission_channel.id, freelancer_message.id, interaction.user.id)
 
 class Tickets(discord.ui.View):
     def __init__(self):
@@ -612,15 +571,13 @@ class TicketsClose(discord.ui.View):
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer()
 
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-            commission_data = await cursor.fetchone()
+        ticket = await get_ticket(interaction.channel.id)
 
-            if commission_data and commission_data[4] != interaction.user.id:
-                if not await check_permissions(interaction):
-                    embed = discord.Embed(title="Error", description="❌ You cannot close this ticket. You are not a staff member or the creator of the commission!", color=discord.Color.from_str(embed_color))
-                    await interaction.followup.send(embed=embed, ephemeral=True)
-                    return
+        if ticket and ticket.creator_id != interaction.user.id:
+            if not await check_permissions(interaction):
+                embed = discord.Embed(title="Error", description="❌ You cannot close this ticket. You are not a staff member or the creator of the ticket!", color=discord.Color.from_str(embed_color))
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
         
         await close_ticket(interaction)
 
@@ -668,7 +625,7 @@ class TicketCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if not any(category_key.lower() in interaction.channel.name.lower() for category_key in data["Tickets"].keys()):
+        if not is_ticket_channel(interaction.channel):
             embed = discord.Embed(title="Error", description="This command can only be used inside a ticket channel!", color=discord.Color.from_str(embed_color))
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
@@ -684,7 +641,7 @@ class TicketCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if not any(category_key.lower() in interaction.channel.name.lower() for category_key in data["Tickets"].keys()):
+        if not is_ticket_channel(interaction.channel):
             embed = discord.Embed(title="Error", description="This command can only be used inside a ticket channel!", color=discord.Color.from_str(embed_color))
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
@@ -708,7 +665,7 @@ class TicketCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if not any(category_key.lower() in interaction.channel.name.lower() for category_key in data["Tickets"].keys()):
+        if not is_ticket_channel(interaction.channel):
             embed = discord.Embed(title="Error", description="This command can only be used inside a ticket channel!", color=discord.Color.from_str(embed_color))
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
@@ -732,7 +689,7 @@ class TicketCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if not any(category_key.lower() in interaction.channel.name.lower() for category_key in data["Tickets"].keys()):
+        if not is_ticket_channel(interaction.channel):
             embed = discord.Embed(title="Error", description="This command can only be used inside a ticket channel!", color=discord.Color.from_str(embed_color))
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
@@ -1,9 +1,9 @@
 import discord
-import aiosqlite
 import yaml
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime
+from cogs.functions.repository import get_commission
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -99,25 +99,23 @@ class VouchCog(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        async with aiosqlite.connect("database.db") as db:
-            cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-            commission_data = await cursor.fetchone()
+        commission_data = await get_commission(interaction.channel.id)
             
-            if not commission_data:
-                embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        if not commission_data:
+            embed = discord.Embed(title="Error", description="This command can only be used in a commission channel.", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
             
-            if not commission_data[5]:
-                embed = discord.Embed(title="Error", description="This commission has no freelancer!", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        if not commission_data.freelancer_id:
+            embed = discord.Embed(title="Error", description="This commission has no freelancer!", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
             
-            freelancer = interaction.guild.get_member(commission_data[5])
-            if not freelancer:
-                embed = discord.Embed(title="Error", description="The freelancer for this commission is not in the server.", color=discord.Color.red())
-                await interaction.followup.send(embed=embed)
-                return
+        freelancer = interaction.guild.get_member(commission_data.freelancer_id)
+        if not freelancer:
+            embed = discord.Embed(title="Error", description="The freelancer for this commission is not in the server.", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
         
         embed = discord.Embed(title="Please leave a Review!", description="Your review is what makes us!\n\nIf you enjoyed our services we would sincerely appreciate you reviewing us!\n\nSelect a rating below to begin - Will only take 1 Minute of your time!", color=discord.Color.from_str(embed_color))
         embed.timestamp = datetime.now()
@@ -1,9 +1,9 @@
 import discord
-import aiosqlite
 import yaml
 from discord import app_commands
 from discord.ext import commands
 from datetime import datetime
+from cogs.functions.repository import cancel_withdrawal, delete_withdrawal, get_ledger, get_wallet, get_withdrawal, request_withdrawal, set_wallet_paypal, set_withdrawal_message
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -19,71 +19,65 @@ class AdminWalletButtons(discord.ui.View):
 
     @discord.ui.button(label='Accept', style=discord.ButtonStyle.green, custom_id='admin_wallet:accept')
     async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT * FROM withdrawals WHERE message_id = ?", (interaction.message.id,))
-            withdrawal_data = await cursor.fetchone()
+        withdrawal_data = await get_withdrawal(interaction.message.id)
             
-            if not withdrawal_data:
-                embed = discord.Embed(title="Error", description="This withdrawal request does not exist.", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not withdrawal_data:
+            embed = discord.Embed(title="Error", description="This withdrawal request does not exist.", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            await db.execute('DELETE FROM withdrawals WHERE message_id = ?', (interaction.message.id,))
-            await db.commit()
+        await delete_withdrawal(interaction.message.id)
 
-            view = AdminWalletButtons()
-            view.accept.disabled = True
-            view.deny.disabled = True
+        view = AdminWalletButtons()
+        view.accept.disabled = True
+        view.deny.disabled = True
 
-            embed = interaction.message.embeds[0]
-            embed.title = "Withdrawal Processed"
+        embed = interaction.message.embeds[0]
+        embed.title = "Withdrawal Processed"
 
-            await interaction.message.edit(embed=embed, view=view)
+        await interaction.message.edit(embed=embed, view=view)
 
-            embed = discord.Embed(title="Withdrawal Processed", description=f"The withdrawal request for `${withdrawal_data[3]:.2f}` has been processed.", color=discord.Color.from_str(embed_color))
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed = discord.Embed(title="Withdrawal Processed", description=f"The withdrawal request for `${withdrawal_data.amount:.2f}` has been processed.", color=discord.Color.from_str(embed_color))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            freelancer = interaction.guild.get_member(withdrawal_data[2])
-            if freelancer:
-                try:
-                    embed = discord.Embed(title="Withdrawal Denied", description=f"Your withdrawal request for `${withdrawal_data[3]:.2f}` has been processed.", color=discord.Color.from_str(embed_color))
-                    await freelancer.send(embed=embed)
-                except:
-                    pass
+        freelancer = interaction.guild.get_member(withdrawal_data.freelancer_id)
+        if freelancer:
+            try:
+                embed = discord.Embed(title="Withdrawal Denied", description=f"Your withdrawal request for `${withdrawal_data.amount:.2f}` has been processed.", color=discord.Color.from_str(embed_color))
+                await freelancer.send(embed=embed)
+            except:
+                pass
 
     @discord.ui.button(label='Deny', style=discord.ButtonStyle.red, custom_id='admin_wallet:deny')
     async def deny(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect('database.db') as db:
-            cursor = await db.execute("SELECT * FROM withdrawals WHERE message_id = ?", (interaction.message.id,))
-            withdrawal_data = await cursor.fetchone()
+        withdrawal_data = await get_withdrawal(interaction.message.id)
             
-            if not withdrawal_data:
-                embed = discord.Embed(title="Error", description="This withdrawal request does not exist.", color=discord.Color.from_str(embed_color))
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
+        if not withdrawal_data:
+            embed = discord.Embed(title="Error", description="This withdrawal request does not exist.", color=discord.Color.from_str(embed_color))
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
             
-            await db.execute('DELETE FROM withdrawals WHERE message_id = ?', (interaction.message.id,))
-            await db.commit()
+        await delete_withdrawal(interaction.message.id)
 
-            view = AdminWalletButtons()
-            view.accept.disabled = True
-            view.deny.disabled = True
+        view = AdminWalletButtons()
+        view.accept.disabled = True
+        view.deny.disabled = True
 
-            embed = interaction.message.embeds[0]
-            embed.title = "Withdrawal Denied"
+        embed = interaction.message.embeds[0]
+        embed.title = "Withdrawal Denied"
 
-            await interaction.message.edit(embed=embed, view=view)
+        await interaction.message.edit(embed=embed, view=view)
 
-            embed = discord.Embed(title="Withdrawal Denied", description=f"The withdrawal request for `${withdrawal_data[3]:.2f}` has been denied.", color=discord.Color.from_str(embed_color))
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed = discord.Embed(title="Withdrawal Denied", description=f"The withdrawal request for `${withdrawal_data.amount:.2f}` has been denied.", color=discord.Color.from_str(embed_color))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            freelancer = interaction.guild.get_member(withdrawal_data[2])
-            if freelancer:
-                try:
-                    embed = discord.Embed(title="Withdrawal Denied", description=f"Your withdrawal request for `${withdrawal_data[3]:.2f}` has been denied.", color=discord.Color.from_str(embed_color))
-                    await freelancer.send(embed=embed)
-                except:
-                    pass
+        freelancer = interaction.guild.get_member(withdrawal_data.freelancer_id)
+        if freelancer:
+            try:
+                embed = discord.Embed(title="Withdrawal Denied", description=f"Your withdrawal request for `${withdrawal_data.amount:.2f}` has been denied.", color=discord.Color.from_str(embed_color))
+                await freelancer.send(embed=embed)
+            except:
+                pass
 
 class WalletModal(discord.ui.Modal):
     def __init__(self, interaction: discord.Interaction, paypal: str = None):
@@ -103,34 +97,21 @@ class WalletModal(discord.ui.Modal):
     async def on_submit(self, interaction: discord.Interaction):
         paypal_email = self.text_input.value.strip()
 
-        async with aiosqlite.connect('database.db') as db:
-            await db.execute(
-                """
-                INSERT INTO wallets (member_id, paypal)
-                VALUES (?, ?)
-                ON CONFLICT(member_id) DO UPDATE SET
-                    paypal = excluded.paypal
-                """,
-                (interaction.user.id, paypal_email)
-            )
-            await db.commit()
-
-            async with db.execute(
-                "SELECT * FROM wallets WHERE member_id = ?", (interaction.user.id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-
-                balance = row[3]
+        await set_wallet_paypal(interaction.user.id, paypal_email)
 
-                embed = discord.Embed(title="Manage Your Wallet", color=discord.Color.from_str(embed_color))
-                embed.add_field(name="Balance", value=f"`${balance:.2f}`", inline=False)
-                embed.add_field(name="PayPal", value=f"`{paypal_email}`", inline=False)
+        wallet = await get_wallet(interaction.user.id)
 
-                embed.set_thumbnail(url=interaction.user.display_avatar.url)
+        balance = wallet.amount
 
-                embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+        embed = discord.Embed(title="Manage Your Wallet", color=discord.Color.from_str(embed_color))
+        embed.add_field(name="Balance", value=f"`${balance:.2f}`", inline=False)
+        embed.add_field(name="PayPal", value=f"`{paypal_email}`", inline=False)
+
+        embed.set_thumbnail(url=interaction.user.display_avatar.url)
 
-                await interaction.response.edit_message(embed=embed, view=WalletButtons())
+        embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+
+        await interaction.response.edit_message(embed=embed, view=WalletButtons())
 
 class WalletButtons(discord.ui.View):
     def __init__(self):
@@ -138,56 +119,47 @@ class WalletButtons(discord.ui.View):
 
     @discord.ui.button(label='PayPal', style=discord.ButtonStyle.blurple, custom_id='wallet_buttons:paypal')
     async def paypal(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect('database.db') as db:
-            async with db.execute(
-                "SELECT paypal FROM wallets WHERE member_id = ?", (interaction.user.id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                placeholder = row[0] if row else None
+        wallet = await get_wallet(interaction.user.id)
+        placeholder = wallet.paypal if wallet else None
 
         await interaction.response.send_modal(WalletModal(interaction, placeholder))
 
     @discord.ui.button(label='Withdraw', style=discord.ButtonStyle.green, custom_id='wallet_buttons:withdraw')
     async def withdraw(self, interaction: discord.Interaction, button: discord.ui.Button):
-        async with aiosqlite.connect('database.db') as db:
-            async with db.execute(
-                "SELECT * FROM wallets WHERE member_id = ?", (interaction.user.id,)
-            ) as cursor:
-                row = await cursor.fetchone()
+        withdrawal = await request_withdrawal(interaction.user.id)
 
-                if row[3] <= 0:
-                    embed = discord.Embed(title="Withdrawal Failed", description="You do not have enough funds to withdraw.", color=discord.Color.from_str(embed_color))
-                    await interaction.response.edit_message(embed=embed, view=None)
-                    return
+        if not withdrawal:
+            embed = discord.Embed(title="Withdrawal Failed", description="You do not have enough funds to withdraw.", color=discord.Color.from_str(embed_color))
+            await interaction.response.edit_message(embed=embed, view=None)
+            return
 
-                withdraw_channel = interaction.guild.get_channel(withdraw_channel_id)
-                embed = discord.Embed(title="Withdraw Requested", description=f"{interaction.user.mention} ({interaction.user.name} | {interaction.user.id}) has requested a withdrawal of `${row[3]:.2f}`.", color=discord.Color.from_str(embed_color))
-                embed.timestamp = datetime.now()
+        withdraw_channel = interaction.guild.get_channel(withdraw_channel_id)
+        embed = discord.Embed(title="Withdraw Requested", description=f"{interaction.user.mention} ({interaction.user.name} | {interaction.user.id}) has requested a withdrawal of `${withdrawal.amount:.2f}`.", color=discord.Color.from_str(embed_color))
+        embed.timestamp = datetime.now()
 
-                embed.set_footer(text="Please review the request and process it accordingly.")
+        embed.set_footer(text="Please review the request and process it accordingly.")
 
-                embed.set_author(name=interaction.user.name, icon_url=interaction.user.display_avatar.url)
-                
-                msg = await withdraw_channel.send(embed=embed, view=AdminWalletButtons())
-
-                await db.execute('UPDATE wallets SET amount = 0 WHERE member_id = ?', (interaction.user.id,))
-                await db.execute(
-                    """
-                    INSERT INTO withdrawals (message_id, freelancer_id, amount)
-                    VALUES (?, ?, ?)
-                    """,
-                    (msg.id, interaction.user.id, row[3])
-                )
-                await db.commit()
-
-                embed = discord.Embed(title="Withdraw Requested", description=f"Your withdrawal request has been submitted for `${row[3]:.2f}`. Please allow up to 24 hours for processing.", color=discord.Color.from_str(embed_color))
-                embed.timestamp = datetime.now()
+        embed.set_author(name=interaction.user.name, icon_url=interaction.user.display_avatar.url)
+
+        try:
+            msg = await withdraw_channel.send(embed=embed, view=AdminWalletButtons())
+        except Exception:
+            await cancel_withdrawal(withdrawal)
+
+            embed = discord.Embed(title="Withdrawal Failed", description="Your withdrawal request could not be submitted, your balance has not been changed. Please try again later.", color=discord.Color.from_str(embed_color))
+            await interaction.response.edit_message(embed=embed, view=None)
+            return
+
+        await set_withdrawal_message(withdrawal.id, msg.id)
+
+        embed = discord.Embed(title="Withdraw Requested", description=f"Your withdrawal request has been submitted for `${withdrawal.amount:.2f}`. Please allow up to 24 hours for processing.", color=discord.Color.from_str(embed_color))
+        embed.timestamp = datetime.now()
                 
-                embed.set_footer(text="You will receive a confirmation message once the withdrawal has been processed.")
+        embed.set_footer(text="You will receive a confirmation message once the withdrawal has been processed.")
 
-                embed.set_author(name=interaction.user.name, icon_url=interaction.user.display_avatar.url)
+        embed.set_author(name=interaction.user.name, icon_url=interaction.user.display_avatar.url)
 
-                await interaction.response.edit_message(embed=embed, view=None)
+        await interaction.response.edit_message(embed=embed, view=None)
 
 class WalletCog(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
@@ -208,41 +180,37 @@ class WalletCog(commands.Cog):
     async def wallet(self, interaction: discord.Interaction, member: discord.Member = None) -> None:
         if member is None:
             if await self.check_freelancer_roles(interaction):
-                async with aiosqlite.connect('database.db') as db:
-                    async with db.execute(
-                        "SELECT * FROM wallets WHERE member_id = ?", (interaction.user.id,)
-                    ) as cursor:
-                        row = await cursor.fetchone()
+                wallet = await get_wallet(interaction.user.id)
 
-                        if not row:
-                            paypal = "N/A"
-                            balance = 0
-                        else:
-                            paypal = row[2]
-                            balance = row[3]
+                if not wallet:
+                    paypal = "N/A"
+                    balance = 0
+                else:
+                    paypal = wallet.paypal
+                    balance = wallet.amount
 
-                        embed = discord.Embed(title="Manage Your Wallet", color=discord.Color.from_str(embed_color))
-                        embed.add_field(name="Balance", value=f"`${balance:.2f}`", inline=False)
-                        embed.add_field(name="PayPal", value=f"`{paypal}`", inline=False)
+                embed = discord.Embed(title="Manage Your Wallet", color=discord.Color.from_str(embed_color))
+                embed.add_field(name="Balance", value=f"`${balance:.2f}`", inline=False)
+                embed.add_field(name="PayPal", value=f"`{paypal}`", inline=False)
 
-                        embed.set_thumbnail(url=interaction.user.display_avatar.url)
+                ledger = await get_ledger(interaction.user.id, 5)
+                if ledger:
+                    embed.add_field(name="Recent Activity", value="\n".join(f"<t:{entry.created_at}:d> `{'+' if entry.amount >= 0 else '-'}${abs(entry.amount):.2f}` {entry.kind.replace('_', ' ').title()}" for entry in ledger), inline=False)
 
-                        embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
+                embed.set_thumbnail(url=interaction.user.display_avatar.url)
+
+                embed.set_author(name=interaction.guild.name, icon_url=interaction.guild.icon.url if interaction.guild.icon else None)
 
-                        await interaction.response.send_message(embed=embed, ephemeral=True, view=WalletButtons())
+                await interaction.response.send_message(embed=embed, ephemeral=True, view=WalletButtons())
             else:
                 embed = discord.Embed(title="Access Denied", description="You do not have the necessary role to set a PayPal email.", color=discord.Color.from_str(embed_color))
                 await interaction.response.send_message(embed=embed, ephemeral=True)
         
         else:
             if await self.check_admin_roles(interaction):
-                async with aiosqlite.connect('database.db') as db:
-                    async with db.execute(
-                        "SELECT paypal FROM wallets WHERE member_id = ?", (member.id,)
-                    ) as cursor:
-                        row = await cursor.fetchone()
+                wallet = await get_wallet(member.id)
 
-                paypal_email = row[0] if row else "Not Set"
+                paypal_email = wallet.paypal if wallet else "Not Set"
                 embed = discord.Embed(title=f"{member.name}'s PayPal Email", description=f"PayPal Email: {paypal_email}", color=discord.Color.from_str(embed_color))
                 embed.set_thumbnail(url=member.display_avatar.url)
                 await interaction.response.send_message(embed=embed, ephemeral=True)
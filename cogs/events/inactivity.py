@@ -0,0 +1,139 @@
+import discord
+import asyncio
+import yaml
+from discord.ext import commands, tasks
+from cogs.functions.recorder import is_ticket_channel, ticket_categories
+from cogs.functions.repository import get_commission
+from cogs.functions.timers import (
+    inactivity_check_interval, inactivity_close_batch, inactivity_close_delay, inactivity_enabled, inactivity_flush_interval,
+    inactivity_hours, inactivity_retry_delay, ticket_timers
+)
+from cogs.functions.utils import close_ticket_channel
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+embed_color = data["General"]["EMBED_COLOR"]
+
+class InactivityCog(commands.Cog):
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.seeded = False
+        self.closed = 0
+        self.notified = set()
+
+    async def cog_load(self):
+        await ticket_timers.load()
+
+        self.flush_loop.start()
+        if inactivity_enabled:
+            self.expire_loop.start()
+
+    async def cog_unload(self):
+        self.expire_loop.cancel()
+        self.flush_loop.cancel()
+        await ticket_timers.flush()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.seeded:
+            return
+
+        self.seeded = True
+        tracked = set(ticket_timers.deadlines)
+
+        # Tickets opened before deadlines were tracked start from their last message, which the
+        # channel already knows without an API call.
+        for category_id in ticket_categories:
+            category = self.bot.get_channel(category_id)
+            if not isinstance(category, discord.CategoryChannel):
+                continue
+
+            for channel in category.text_channels:
+                tracked.discard(channel.id)
+
+                if channel.id not in ticket_timers:
+                    last_activity = discord.utils.snowflake_time(channel.last_message_id) if channel.last_message_id else channel.created_at
+                    ticket_timers.touch(channel.id, last_activity.timestamp())
+
+        # Whatever is left was deleted while the bot was offline.
+        for channel_id in tracked:
+            if not self.bot.get_channel(channel_id):
+                ticket_timers.remove(channel_id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not message.author.bot and is_ticket_channel(message.channel):
+            ticket_timers.touch(message.channel.id)
+            self.notified.discard(message.channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        if is_ticket_channel(channel):
+            ticket_timers.touch(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if channel.id in ticket_timers:
+            ticket_timers.remove(channel.id)
+
+        self.notified.discard(channel.id)
+
+    @tasks.loop(seconds = inactivity_check_interval)
+    async def expire_loop(self):
+        # Only the tickets that are due come off the heap, and at most a batch of them per cycle so
+        # a backlog of stale tickets is closed gradually instead of all at once.
+        for index, channel_id in enumerate(ticket_timers.pop_expired(limit=inactivity_close_batch)):
+            channel = self.bot.get_channel(channel_id)
+
+            if not channel:
+                ticket_timers.remove(channel_id)
+                continue
+
+            # A freelancer can go quiet while working on a commission, those are never closed for inactivity.
+            try:
+                commission = await get_commission(channel_id)
+            except Exception as error:
+                print(f'Failed to look up {channel.name} before closing it for inactivity, retrying later: {error}')
+                ticket_timers.postpone(channel_id, inactivity_retry_delay)
+                continue
+
+            if commission and commission.freelancer_id:
+                ticket_timers.touch(channel_id)
+                continue
+
+            if index:
+                await asyncio.sleep(inactivity_close_delay)
+
+            try:
+                # A close that keeps failing is retried quietly, the notice is only posted once.
+                if channel_id not in self.notified:
+                    embed = discord.Embed(description=f"🔒 This ticket is being closed after {inactivity_hours} hours of inactivity.", color=discord.Color.from_str(embed_color))
+                    await channel.send(embed=embed)
+                    self.notified.add(channel_id)
+
+                error = await close_ticket_channel(self.bot, channel)
+            except Exception as exception:
+                error = str(exception)
+
+            if error:
+                print(f'Failed to close {channel.name} for inactivity, retrying later: {error}')
+                ticket_timers.postpone(channel_id, inactivity_retry_delay)
+            else:
+                self.notified.discard(channel_id)
+                self.closed += 1
+
+    @tasks.loop(seconds = inactivity_flush_interval)
+    async def flush_loop(self):
+        try:
+            await ticket_timers.flush()
+        except Exception as error:
+            print(f'Failed to save ticket deadlines, retrying next cycle: {error}')
+
+    @expire_loop.before_loop
+    async def before_expire_loop(self):
+        await self.bot.wait_until_ready()
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(InactivityCog(bot))
\ No newline at end of file
@@ -0,0 +1,113 @@
+import discord
+from discord.ext import commands, tasks
+from cogs.functions.recorder import capture_interval, is_ticket_channel, recorder, ticket_categories
+from cogs.functions.repository import get_ticket_checkpoints
+
+class MessageEventsCog(commands.Cog):
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.checkpoints = None
+
+    async def cog_load(self):
+        # Read before the gateway connects, so messages arriving during startup can't be mistaken
+        # for the point a ticket was last captured up to.
+        self.checkpoints = await get_ticket_checkpoints()
+        self.flush_loop.start()
+
+    async def cog_unload(self):
+        self.flush_loop.cancel()
+        await recorder.flush()
+
+    @tasks.loop(seconds = capture_interval)
+    async def flush_loop(self):
+        try:
+            await recorder.flush()
+        except Exception as error:
+            print(f'Failed to save ticket messages, retrying next cycle: {error}')
+
+    async def record(self, message: discord.Message):
+        recorder.record(message)
+
+        if recorder.full:
+            await recorder.flush()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if self.checkpoints is None:
+            return
+
+        checkpoints, self.checkpoints = self.checkpoints, None
+
+        # Catches up on whatever was posted while the bot was offline, once per start. Tickets
+        # opened before messages were captured are read in full this one time.
+        for category_id in ticket_categories:
+            category = self.bot.get_channel(category_id)
+            if not isinstance(category, discord.CategoryChannel):
+                continue
+
+            for channel in category.text_channels:
+                after = checkpoints.get(channel.id)
+
+                # Until a channel is caught up, closing it reads the transcript from Discord instead.
+                try:
+                    async for message in channel.history(limit=None, after=discord.Object(id=after) if after else None, oldest_first=True):
+                        await self.record(message)
+                except discord.HTTPException as error:
+                    print(f'Failed to catch up on messages in {channel.name}: {error}')
+                    continue
+
+                recorder.mark_complete(channel.id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if is_ticket_channel(message.channel):
+            await self.record(message)
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        if is_ticket_channel(after.channel):
+            await self.record(after)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        # on_message_edit only fires for cached messages, anything posted before a restart is
+        # fetched so the stored copy still picks up the edit.
+        if payload.cached_message is not None:
+            return
+
+        channel = self.bot.get_channel(payload.channel_id)
+        if not is_ticket_channel(channel):
+            return
+
+        try:
+            message = await channel.fetch_message(payload.message_id)
+        except discord.HTTPException as error:
+            print(f'Failed to fetch an edited message in {channel.name}: {error}')
+            return
+
+        await self.record(message)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        # A ticket opened while the bot is running has every message captured from the start.
+        if is_ticket_channel(channel):
+            recorder.mark_complete(channel.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if is_ticket_channel(self.bot.get_channel(payload.channel_id)):
+            recorder.forget([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if is_ticket_channel(self.bot.get_channel(payload.channel_id)):
+            recorder.forget(payload.message_ids)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if is_ticket_channel(channel):
+            await recorder.clear_channel(channel.id)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MessageEventsCog(bot))
\ No newline at end of file
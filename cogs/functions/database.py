@@ -0,0 +1,210 @@
+import asyncio
+import aiosqlite
+import yaml
+from contextlib import asynccontextmanager
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+database_config = data.get("Database", {})
+database_path = database_config.get("PATH", "database.db")
+pool_size = database_config.get("POOL_SIZE", 4)
+mmap_size = database_config.get("MMAP_SIZE", 268435456)
+cache_size = database_config.get("CACHE_SIZE", 16000)
+busy_timeout = database_config.get("BUSY_TIMEOUT", 5000)
+commit_window = database_config.get("COMMIT_WINDOW", 2) / 1000
+max_batch = database_config.get("MAX_BATCH", 64)
+
+class Database:
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._pool = None
+        self._connections = []
+        self._writer = None
+        self._queue = None
+        self._writer_task = None
+        self._write_lock = asyncio.Lock()
+
+        self.commits = 0
+        self.writes = 0
+
+    async def connect(self, **kwargs) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, **kwargs)
+
+        # Only takes effect on a new database, existing ones are converted by /maintenance vacuum.
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await db.execute("PRAGMA journal_mode = WAL")
+        await db.execute("PRAGMA synchronous = NORMAL")
+        await db.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        await db.execute(f"PRAGMA cache_size = {-int(cache_size)}")
+        await db.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        await db.execute("PRAGMA temp_store = MEMORY")
+
+        return db
+
+    async def start(self):
+        if self._pool is not None:
+            return
+
+        self._pool = asyncio.Queue()
+
+        for _ in range(self.size):
+            db = await self.connect()
+            self._connections.append(db)
+            self._pool.put_nowait(db)
+
+        self._writer = await self.connect(isolation_level=None)
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        if self._pool is None:
+            return
+
+        self._queue.put_nowait(None)
+        await self._writer_task
+        await self._writer.close()
+        self._writer = None
+        self._writer_task = None
+
+        for db in self._connections:
+            await db.close()
+
+        self._connections.clear()
+        self._pool = None
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._pool is None:
+            raise RuntimeError("The database pool has not been started.")
+
+        try:
+            db = self._pool.get_nowait()
+            pooled = True
+        except asyncio.QueueEmpty:
+            # Every long-lived connection is borrowed (usually by a handler waiting on Discord),
+            # so hand out a short-lived one instead of making this interaction wait in line.
+            db = await self.connect()
+            pooled = False
+
+        try:
+            yield db
+        finally:
+            if pooled:
+                await self._release(db)
+            else:
+                await db.close()
+
+    async def _release(self, db: aiosqlite.Connection):
+        if self._pool is None:
+            await db.close()
+            return
+
+        try:
+            if db.in_transaction:
+                await db.rollback()
+        except Exception:
+            self._connections.remove(db)
+            await db.close()
+
+            db = await self.connect()
+            self._connections.append(db)
+
+        self._pool.put_nowait(db)
+
+    @asynccontextmanager
+    async def exclusive(self):
+        # Holds the writer between commits, so maintenance that needs the write lock for a
+        # while (VACUUM) runs without queued writes timing out against it.
+        async with self._write_lock:
+            yield
+
+    async def transaction(self, operation):
+        if self._queue is None:
+            raise RuntimeError("The database writer has not been started.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+
+        return await future
+
+    async def execute(self, sql: str, parameters: tuple = ()):
+        async def operation(db: aiosqlite.Connection):
+            return await db.execute(sql, parameters)
+
+        return await self.transaction(operation)
+
+    async def batch(self, statements: list) -> list:
+        async def operation(db: aiosqlite.Connection):
+            return [await db.execute(sql, parameters) for sql, parameters in statements]
+
+        return await self.transaction(operation)
+
+    async def _write_loop(self):
+        stopping = False
+
+        while not stopping or not self._queue.empty():
+            jobs = [await self._queue.get()]
+
+            # Other interactions are already waiting on the writer, give the rest of the burst
+            # a moment to arrive so they share the same commit.
+            if commit_window > 0 and not self._queue.empty():
+                await asyncio.sleep(commit_window)
+
+            while len(jobs) < max_batch and not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+
+            if None in jobs:
+                stopping = True
+                jobs = [job for job in jobs if job is not None]
+
+            if jobs:
+                async with self._write_lock:
+                    await self._commit(jobs)
+
+    async def _commit(self, jobs: list):
+        db = self._writer
+        results = []
+
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+
+            for operation, future in jobs:
+                await db.execute("SAVEPOINT job")
+                try:
+                    result = await operation(db)
+                except Exception as error:
+                    await db.execute("ROLLBACK TO job")
+                    await db.execute("RELEASE job")
+                    results.append((future, None, error))
+                else:
+                    await db.execute("RELEASE job")
+                    results.append((future, result, None))
+
+            await db.execute("COMMIT")
+        except Exception as error:
+            try:
+                if db.in_transaction:
+                    await db.execute("ROLLBACK")
+            except Exception:
+                pass
+
+            for _, future in jobs:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.commits += 1
+        self.writes += len(jobs)
+
+        for future, result, error in results:
+            if future.done():
+                continue
+
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+database = Database(database_path, pool_size)
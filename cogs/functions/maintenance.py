@@ -0,0 +1,288 @@
+import discord
+import asyncio
+import sqlite3
+import yaml
+import time
+import os
+from discord.ext import commands
+from discord import app_commands
+from datetime import datetime
+from cogs.functions.database import database, busy_timeout
+from cogs.functions.repository import get_wallet_mismatches
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+embed_color = data["General"]["EMBED_COLOR"]
+snapshot_dir = data.get("Database", {}).get("SNAPSHOT_DIR", "snapshots")
+vacuum_chunk = data.get("Database", {}).get("VACUUM_CHUNK", 256)
+progress_interval = data.get("Database", {}).get("PROGRESS_INTERVAL", 3)
+
+class Progress:
+    def __init__(self, title: str):
+        self.title = title
+        self.status = "Starting..."
+        self.steps = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def handler(self, report=None):
+        # Called by SQLite every few thousand VM instructions from the worker thread, returning
+        # anything truthy would abort the statement.
+        def tick():
+            self.steps += 1
+            if report:
+                report()
+
+        return tick
+
+    def embed(self, description: str = None, color: discord.Color = None) -> discord.Embed:
+        embed = discord.Embed(title=self.title, description=description or self.status, color=color or discord.Color.from_str(embed_color))
+        embed.set_footer(text=f"Elapsed: {self.elapsed:.1f}s")
+
+        return embed
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def connect_direct() -> sqlite3.Connection:
+    # Maintenance statements run on their own connection in a worker thread, so the pool and the
+    # writer keep serving interactions while they work.
+    return sqlite3.connect(database.path, timeout=busy_timeout / 1000, isolation_level=None)
+
+def page_stats(db: sqlite3.Connection) -> tuple:
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = db.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return page_size, page_count, freelist_count
+
+def write_snapshot(progress: Progress, target: str) -> int:
+    def report():
+        if progress.steps % 50 == 0 and os.path.exists(target):
+            progress.status = f"Writing `{target}`... {format_size(os.path.getsize(target))} so far"
+
+    db = connect_direct()
+    try:
+        db.set_progress_handler(progress.handler(report), 10000)
+        db.execute("VACUUM INTO ?", (target,))
+    finally:
+        db.close()
+
+    return os.path.getsize(target)
+
+def convert_auto_vacuum(progress: Progress) -> int:
+    db = connect_direct()
+    try:
+        page_size, before, _ = page_stats(db)
+
+        db.set_progress_handler(progress.handler(), 10000)
+        db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        db.execute("VACUUM")
+
+        _, after, _ = page_stats(db)
+    finally:
+        db.close()
+
+    return (before - after) * page_size
+
+def vacuum_chunk_pages(pages: int) -> int:
+    db = connect_direct()
+    try:
+        # executescript steps the pragma to completion, execute would only free a single page.
+        db.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        return db.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        db.close()
+
+def run_analyze(progress: Progress):
+    db = connect_direct()
+    try:
+        db.set_progress_handler(progress.handler(), 10000)
+        db.execute("PRAGMA analysis_limit = 1000")
+        db.execute("ANALYZE")
+    finally:
+        db.close()
+
+def run_integrity_check(progress: Progress) -> list:
+    def report():
+        progress.status = f"Checking pages... ({progress.steps * 10000:,} instructions)"
+
+    db = connect_direct()
+    try:
+        db.set_progress_handler(progress.handler(report), 10000)
+        return [row[0] for row in db.execute("PRAGMA integrity_check(20)").fetchall()]
+    finally:
+        db.close()
+
+def object_sizes() -> tuple:
+    db = connect_direct()
+    try:
+        page_size, page_count, freelist_count = page_stats(db)
+
+        try:
+            rows = db.execute("""
+                SELECT name, SUM(pgsize), SUM(ncell) FROM dbstat
+                GROUP BY name ORDER BY SUM(pgsize) DESC
+            """).fetchall()
+        except sqlite3.OperationalError:
+            # SQLite was built without the dbstat table, row counts are the best we can do.
+            tables = db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'").fetchall()
+            rows = [(name, None, db.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]) for (name,) in tables]
+    finally:
+        db.close()
+
+    return page_size, page_count, freelist_count, rows
+
+class MaintenanceCog(commands.GroupCog, name="maintenance"):
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.lock = asyncio.Lock()
+
+    async def run(self, interaction: discord.Interaction, title: str, operation) -> None:
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        if not await self.bot.is_owner(interaction.user):
+            embed = discord.Embed(description="You do not have permission to use this command!", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
+
+        if self.lock.locked():
+            embed = discord.Embed(description="Another maintenance task is already running!", color=discord.Color.red())
+            await interaction.followup.send(embed=embed)
+            return
+
+        async with self.lock:
+            progress = Progress(title)
+            message = await interaction.followup.send(embed=progress.embed(), wait=True)
+            task = asyncio.create_task(operation(progress))
+
+            while not task.done():
+                await asyncio.wait({task}, timeout=progress_interval)
+                if not task.done():
+                    try:
+                        await message.edit(embed=progress.embed())
+                    except discord.HTTPException:
+                        pass
+
+            try:
+                embed = progress.embed(task.result(), discord.Color.green())
+            except Exception as error:
+                embed = progress.embed(f"Failed: `{error}`", discord.Color.red())
+
+            await message.edit(embed=embed)
+
+    @app_commands.command(name="snapshot", description="Writes a compacted copy of the database without stopping the bot!")
+    @app_commands.default_permissions(administrator=True)
+    async def snapshot(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            target = os.path.join(snapshot_dir, f"database-{datetime.now():%Y%m%d-%H%M%S}.db")
+
+            size = await asyncio.to_thread(write_snapshot, progress, target)
+            return f"Snapshot written to `{target}` ({format_size(size)})."
+
+        await self.run(interaction, "Database Snapshot", operation)
+
+    @app_commands.command(name="vacuum", description="Reclaims free pages left behind by deleted rows!")
+    @app_commands.default_permissions(administrator=True)
+    async def vacuum(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            async with database.connection() as db:
+                cursor = await db.execute("PRAGMA auto_vacuum")
+                (mode,) = await cursor.fetchone()
+                cursor = await db.execute("PRAGMA page_size")
+                (page_size,) = await cursor.fetchone()
+                cursor = await db.execute("PRAGMA freelist_count")
+                (total,) = await cursor.fetchone()
+
+            if mode != 2:
+                # Switching auto_vacuum needs one full VACUUM, later runs can go incrementally.
+                progress.status = "Converting the database to incremental vacuum, this only happens once..."
+                async with database.exclusive():
+                    reclaimed = await asyncio.to_thread(convert_auto_vacuum, progress)
+
+                return f"Converted to incremental vacuum and reclaimed {format_size(reclaimed)}."
+
+            remaining = total
+            while remaining:
+                # Only the writer is paused, and only for one chunk at a time, so queued writes
+                # get committed between chunks.
+                async with database.exclusive():
+                    freed = remaining
+                    remaining = await asyncio.to_thread(vacuum_chunk_pages, vacuum_chunk)
+
+                if remaining >= freed:
+                    break
+
+                progress.status = f"Reclaimed {total - remaining:,}/{total:,} pages..."
+
+            return f"Reclaimed {total - remaining:,} pages ({format_size((total - remaining) * page_size)})."
+
+        await self.run(interaction, "Database Vacuum", operation)
+
+    @app_commands.command(name="analyze", description="Refreshes the statistics used by the query planner!")
+    @app_commands.default_permissions(administrator=True)
+    async def analyze(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            progress.status = "Analyzing tables and indexes..."
+            await asyncio.to_thread(run_analyze, progress)
+
+            return "Query planner statistics refreshed."
+
+        await self.run(interaction, "Database Analyze", operation)
+
+    @app_commands.command(name="integrity", description="Checks the database for corruption!")
+    @app_commands.default_permissions(administrator=True)
+    async def integrity(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            problems = await asyncio.to_thread(run_integrity_check, progress)
+
+            if problems == ["ok"]:
+                return "No problems found."
+
+            return "**Problems found:**\n" + "\n".join(f"- `{problem}`" for problem in problems)
+
+        await self.run(interaction, "Database Integrity Check", operation)
+
+    @app_commands.command(name="ledger", description="Checks every wallet balance against its ledger!")
+    @app_commands.default_permissions(administrator=True)
+    async def ledger(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            progress.status = "Comparing wallets with the ledger..."
+            mismatches = await get_wallet_mismatches()
+
+            if not mismatches:
+                return "Every wallet matches its ledger."
+
+            lines = [f"- <@{member_id}>: wallet `${balance:.2f}`, ledger `${balance_after or 0:.2f}`" for member_id, balance, balance_after in mismatches]
+            return f"**{len(mismatches)} wallet(s) don't match their ledger:**\n" + "\n".join(lines)[:3900]
+
+        await self.run(interaction, "Wallet Ledger Check", operation)
+
+    @app_commands.command(name="sizes", description="Shows how much space each table and index uses!")
+    @app_commands.default_permissions(administrator=True)
+    async def sizes(self, interaction: discord.Interaction) -> None:
+        async def operation(progress: Progress) -> str:
+            page_size, page_count, freelist_count, rows = await asyncio.to_thread(object_sizes)
+
+            lines = [f"{'Name':<40} {'Size':>10} {'Cells':>8}"]
+            for name, size, cells in rows:
+                lines.append(f"{name[:40]:<40} {format_size(size) if size is not None else '-':>10} {cells:>8,}")
+
+            return (
+                f"**File:** {format_size(page_count * page_size)}\n"
+                f"**Free:** {format_size(freelist_count * page_size)} ({freelist_count:,} pages)\n"
+                "```\n" + "\n".join(lines)[:3900] + "\n```"
+            )
+
+        await self.run(interaction, "Database Sizes", operation)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MaintenanceCog(bot))
\ No newline at end of file
@@ -0,0 +1,279 @@
+import aiosqlite
+import sqlite3
+from datetime import datetime
+
+# Applied in order and recorded in schema_version. Never edit a migration that has shipped,
+# append a new one instead.
+MIGRATIONS = [
+    (1, "Create base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS commissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER UNIQUE,
+            freelancer_channel_id INTEGER,
+            freelancer_message_id INTEGER,
+            creator_id INTEGER,
+            freelancer_id INTEGER DEFAULT NULL,
+            amount INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS embeds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            description TEXT,
+            author TEXT,
+            footer TEXT,
+            author_image TEXT,
+            thumbnail_image TEXT,
+            large_image TEXT,
+            footer_image TEXT,
+            embed_color TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS invoices (
+            channel_id INTEGER,
+            message_id INTEGER,
+            invoice_id INTEGER,
+            amount INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER UNIQUE,
+            portfolio TEXT DEFAULT NULL,
+            timezone TEXT DEFAULT NULL,
+            built_by_bit TEXT DEFAULT NULL,
+            description TEXT DEFAULT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS wallets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER UNIQUE,
+            paypal TEXT DEFAULT NULL,
+            amount INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS withdrawals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER,
+            freelancer_id INTEGER,
+            amount INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER,
+            message_id INTEGER,
+            freelancer_id INTEGER,
+            question TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS quotes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER,
+            message_id INTEGER,
+            freelancer_id INTEGER,
+            amount INTEGER
+        )
+        """,
+    ]),
+    (2, "Index hot lookup columns", [
+        "CREATE INDEX IF NOT EXISTS idx_commissions_freelancer_message_id ON commissions (freelancer_message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_channel_id ON invoices (channel_id)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_message_id ON invoices (message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_withdrawals_message_id ON withdrawals (message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_questions_channel_id ON questions (channel_id)",
+        "CREATE INDEX IF NOT EXISTS idx_questions_message_id ON questions (message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_quotes_channel_id ON quotes (channel_id)",
+        "CREATE INDEX IF NOT EXISTS idx_quotes_message_id ON quotes (message_id)",
+    ]),
+    (3, "Record database backups", [
+        """
+        CREATE TABLE IF NOT EXISTS backups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT,
+            created_at INTEGER,
+            duration REAL,
+            pages INTEGER,
+            size INTEGER,
+            compressed_size INTEGER
+        )
+        """,
+    ]),
+    (4, "Add the wallet ledger", [
+        """
+        CREATE TABLE IF NOT EXISTS wallet_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            kind TEXT NOT NULL,
+            reference TEXT,
+            balance_after REAL NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_wallet_ledger_member_id_created_at ON wallet_ledger (member_id, created_at)",
+        """
+        CREATE TRIGGER IF NOT EXISTS wallet_ledger_no_update BEFORE UPDATE ON wallet_ledger
+        BEGIN
+            SELECT RAISE(ABORT, 'wallet_ledger is append-only');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS wallet_ledger_no_delete BEFORE DELETE ON wallet_ledger
+        BEGIN
+            SELECT RAISE(ABORT, 'wallet_ledger is append-only');
+        END
+        """,
+        """
+        INSERT INTO wallet_ledger (member_id, amount, kind, reference, balance_after, created_at)
+        SELECT member_id, amount, 'opening', NULL, amount, CAST(strftime('%s', 'now') AS INTEGER)
+        FROM wallets WHERE amount != 0
+        """,
+    ]),
+    (5, "Persist the invoice polling schedule", [
+        "ALTER TABLE invoices ADD COLUMN created_at INTEGER",
+        "ALTER TABLE invoices ADD COLUMN next_check_at REAL",
+        "ALTER TABLE invoices ADD COLUMN check_count INTEGER NOT NULL DEFAULT 0",
+        "UPDATE invoices SET created_at = CAST(strftime('%s', 'now') AS INTEGER), next_check_at = strftime('%s', 'now') WHERE created_at IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_next_check_at ON invoices (next_check_at)",
+    ]),
+    (6, "Index invoices by PayPal invoice id", [
+        "CREATE INDEX IF NOT EXISTS idx_invoices_invoice_id ON invoices (invoice_id)",
+    ]),
+    (7, "Track invoices as a state machine", [
+        "ALTER TABLE invoices ADD COLUMN state TEXT NOT NULL DEFAULT 'polling'",
+        "ALTER TABLE invoices ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE invoices ADD COLUMN last_error TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_state ON invoices (state)",
+    ]),
+    (8, "Capture ticket messages as they are posted", [
+        """
+        CREATE TABLE IF NOT EXISTS ticket_messages (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            data TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_messages_channel_id ON ticket_messages (channel_id)",
+    ]),
+    (9, "Persist ticket inactivity deadlines", [
+        """
+        CREATE TABLE IF NOT EXISTS ticket_deadlines (
+            channel_id INTEGER PRIMARY KEY,
+            deadline REAL NOT NULL
+        )
+        """,
+    ]),
+    (10, "Record every ticket with its creator and category", [
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER UNIQUE NOT NULL,
+            creator_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_activity INTEGER,
+            closed_at INTEGER
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_tickets_creator_id ON tickets (creator_id)",
+        """
+        INSERT OR IGNORE INTO tickets (channel_id, creator_id, category, created_at)
+        SELECT channel_id, creator_id, 'QUOTES', CAST(strftime('%s', 'now') AS INTEGER) FROM commissions
+        WHERE channel_id IS NOT NULL AND creator_id IS NOT NULL
+        """,
+    ]),
+]
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at INTEGER
+    )
+"""
+
+_expected_schema = None
+
+def expected_schema() -> list:
+    global _expected_schema
+
+    if _expected_schema is None:
+        # Replaying the migrations against an empty in-memory database gives the exact
+        # definition of every object, so the migrations stay the only source of truth.
+        memory = sqlite3.connect(":memory:")
+        try:
+            memory.execute(SCHEMA_VERSION_TABLE)
+            for _, _, statements in MIGRATIONS:
+                for statement in statements:
+                    memory.execute(statement)
+
+            _expected_schema = memory.execute("""
+                SELECT type, name, tbl_name, sql FROM sqlite_master
+                WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+                ORDER BY type = 'index', rowid
+            """).fetchall()
+        finally:
+            memory.close()
+
+    return _expected_schema
+
+async def existing_objects(db: aiosqlite.Connection) -> set:
+    cursor = await db.execute("SELECT name FROM sqlite_master")
+    return {row[0] for row in await cursor.fetchall()}
+
+async def migrate(db: aiosqlite.Connection) -> dict:
+    existing = await existing_objects(db)
+
+    current = 0
+    if "schema_version" in existing:
+        cursor = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        (current,) = await cursor.fetchone()
+
+    pending = [migration for migration in MIGRATIONS if migration[0] > current]
+    missing = [name for _, name, _, _ in expected_schema() if name not in existing]
+    applied = []
+    created = []
+
+    if not pending and not missing:
+        return {"applied": applied, "created": created}
+
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        if "schema_version" not in existing:
+            await db.execute(SCHEMA_VERSION_TABLE)
+            existing.add("schema_version")
+
+        for version, description, statements in pending:
+            for statement in statements:
+                await db.execute(statement)
+
+            await db.execute("INSERT INTO schema_version VALUES (?, ?, ?)", (version, description, int(datetime.now().timestamp())))
+            applied.append(version)
+
+        if pending:
+            existing = await existing_objects(db)
+
+        for _, name, _, statement in expected_schema():
+            if name not in existing:
+                await db.execute(statement)
+                created.append(name)
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if applied or created:
+        await db.execute("ANALYZE")
+        await db.commit()
+
+    return {"applied": applied, "created": created}
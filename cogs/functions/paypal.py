@@ -0,0 +1,171 @@
+import aiohttp
+import asyncio
+import random
+import json
+import yaml
+import time
+import uuid
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+paypal_client_id = data["Invoice"]["PAYPAL_CLIENT_ID"]
+paypal_client_secret = data["Invoice"]["PAYPAL_CLIENT_SECRET"]
+paypal_mode = data["Invoice"].get("PAYPAL_MODE", "live")
+paypal_base_url = data["Invoice"].get("PAYPAL_BASE_URL") or ("https://api-m.paypal.com" if paypal_mode == "live" else "https://api-m.sandbox.paypal.com")
+paypal_concurrency = data["Invoice"].get("PAYPAL_CONCURRENCY", 8)
+paypal_timeout = data["Invoice"].get("PAYPAL_TIMEOUT", 15)
+paypal_retries = data["Invoice"].get("PAYPAL_RETRIES", 3)
+paypal_backoff = data["Invoice"].get("PAYPAL_BACKOFF", 0.5)
+
+class PayPalError(Exception):
+    def __init__(self, status: int, name: str = None, message: str = None):
+        super().__init__(f"{status} {name or 'ERROR'}: {message or 'PayPal request failed'}")
+        self.status = status
+        self.name = name
+        self.message = message
+
+    @property
+    def transient(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+async def read_body(response: aiohttp.ClientResponse) -> dict:
+    # Gateways in front of PayPal answer outages with HTML pages. Those are raised as a PayPalError
+    # with the response's status, so a 502 is still a temporary failure and not a decode error.
+    text = await response.text()
+    if not text:
+        return {}
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        raise PayPalError(response.status, "INVALID_RESPONSE", text[:200])
+
+class PayPalClient:
+    def __init__(self, client_id: str, client_secret: str, base_url: str):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url.rstrip("/")
+
+        self._session = None
+        self._semaphore = asyncio.Semaphore(paypal_concurrency)
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = asyncio.Lock()
+
+        self.requests = 0
+        self.retries = 0
+        self.token_refreshes = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # One keep-alive session for the lifetime of the bot, connections to PayPal are reused
+        # instead of paying for a TLS handshake on every call.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=paypal_concurrency, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=paypal_timeout),
+            )
+
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+        self._session = None
+
+    async def token(self) -> str:
+        if self._token and time.monotonic() < self._token_expires:
+            return self._token
+
+        async with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires:
+                return self._token
+
+            async with self.session.post(
+                f"{self.base_url}/v1/oauth2/token",
+                data={"grant_type": "client_credentials"},
+                auth=aiohttp.BasicAuth(self.client_id, self.client_secret),
+                headers={"Accept": "application/json"},
+            ) as response:
+                body = await read_body(response)
+
+                if response.status != 200:
+                    raise PayPalError(response.status, body.get("error"), body.get("error_description"))
+
+            # Refreshed a minute early so a token never expires between being read and being used.
+            self._token = body["access_token"]
+            self._token_expires = time.monotonic() + int(body.get("expires_in", 3600)) - 60
+            self.token_refreshes += 1
+
+            return self._token
+
+    async def request(self, method: str, path: str, json: dict = None, params: dict = None, request_id: str = None) -> dict:
+        attempt = 0
+
+        while True:
+            delay = paypal_backoff * (2 ** attempt) * (0.5 + random.random())
+
+            try:
+                headers = {"Authorization": f"Bearer {await self.token()}", "Accept": "application/json"}
+                if request_id:
+                    # Lets PayPal recognise a retried POST instead of creating a second invoice.
+                    headers["PayPal-Request-Id"] = request_id
+
+                async with self._semaphore:
+                    self.requests += 1
+
+                    async with self.session.request(method, f"{self.base_url}{path}", json=json, params=params, headers=headers) as response:
+                        if response.status == 401:
+                            self._token = None
+
+                        body = await read_body(response) if response.status != 204 else None
+
+                        if response.status >= 400:
+                            body = body or {}
+                            error = PayPalError(response.status, body.get("name") or body.get("error"), body.get("message") or body.get("error_description"))
+
+                            if response.status == 429 and response.headers.get("Retry-After", "").isdigit():
+                                delay = int(response.headers["Retry-After"])
+
+                            raise error
+
+                        return body or {}
+            except PayPalError as error:
+                if not (error.transient or error.status == 401) or attempt >= paypal_retries:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= paypal_retries:
+                    raise
+
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def create_invoice(self, invoice_data: dict, request_id: str = None) -> dict:
+        return await self.request("POST", "/v1/invoicing/invoices", json=invoice_data, request_id=request_id or str(uuid.uuid4()))
+
+    async def find_invoice(self, invoice_id: str) -> dict:
+        return await self.request("GET", f"/v1/invoicing/invoices/{invoice_id}")
+
+    async def send_invoice(self, invoice_id: str, notify_merchant: bool = True, request_id: str = None) -> dict:
+        return await self.request("POST", f"/v1/invoicing/invoices/{invoice_id}/send", params={"notify_merchant": str(notify_merchant).lower()}, request_id=request_id)
+
+    async def verify_webhook_signature(self, headers: dict, webhook_id: str, event: dict) -> bool:
+        body = await self.request("POST", "/v1/notifications/verify-webhook-signature", json={
+            "auth_algo": headers.get("PAYPAL-AUTH-ALGO"),
+            "cert_url": headers.get("PAYPAL-CERT-URL"),
+            "transmission_id": headers.get("PAYPAL-TRANSMISSION-ID"),
+            "transmission_sig": headers.get("PAYPAL-TRANSMISSION-SIG"),
+            "transmission_time": headers.get("PAYPAL-TRANSMISSION-TIME"),
+            "webhook_id": webhook_id,
+            "webhook_event": event,
+        })
+
+        return body.get("verification_status") == "SUCCESS"
+
+    async def search_invoices(self, page: int = 0, page_size: int = 100, **criteria) -> dict:
+        return await self.request("POST", "/v1/invoicing/search", json={**criteria, "page": page, "page_size": page_size, "total_count_required": True})
+
+paypal = PayPalClient(paypal_client_id, paypal_client_secret, paypal_base_url)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import yaml
+import time
+from datetime import datetime
+from cogs.functions.paypal import paypal
+from cogs.functions.schedule import Schedule
+from cogs.functions.repository import Invoice, get_invoices, reschedule_invoices
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+poll_min_interval = data["Invoice"].get("POLL_MIN_INTERVAL", 5)
+poll_max_interval = data["Invoice"].get("POLL_MAX_INTERVAL", 3600)
+poll_batch = data["Invoice"].get("POLL_BATCH", 25)
+poll_restart_spread = data["Invoice"].get("POLL_RESTART_SPREAD", 60)
+
+reconcile_config = data["Invoice"].get("RECONCILE", {})
+reconcile_enabled = reconcile_config.get("ENABLED", False)
+reconcile_interval = reconcile_config.get("INTERVAL", 60)
+reconcile_page_size = reconcile_config.get("PAGE_SIZE", 100)
+reconcile_max_age = reconcile_config.get("MAX_AGE", 604800)
+reconcile_statuses = ["PAID", "MARKED_AS_PAID", "CANCELLED"]
+
+# With webhooks delivering payments, polling is only a fallback for events that went missing.
+if data["Invoice"].get("WEBHOOK", {}).get("ENABLED", False):
+    poll_min_interval = max(poll_min_interval, data["Invoice"]["WEBHOOK"].get("FALLBACK_INTERVAL", 300))
+
+def next_interval(check_count: int) -> float:
+    # A new invoice is usually paid within minutes, so it's checked often at first and then
+    # less and less, settling at poll_max_interval for invoices left unpaid for days.
+    interval = min(poll_max_interval, poll_min_interval * 2 ** min(check_count, 32))
+    return interval * random.uniform(0.9, 1.1)
+
+class InvoicePoller:
+    def __init__(self, check):
+        # check(invoice, status=None) returns True once the invoice no longer needs polling (paid or
+        # removed). Without a status it looks the invoice up itself.
+        self.check = check
+        self.schedule = Schedule()
+        self.invoices = {}
+
+        self.checks = 0
+        self.finished = 0
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self.invoices)
+
+    async def load(self, now: float = None):
+        now = now or time.time()
+        invoices = await get_invoices()
+        overdue = [invoice for invoice in invoices if (invoice.next_check_at or 0) <= now]
+
+        # Everything that came due while the bot was offline is spread out over the first minute
+        # instead of all being checked on the first tick.
+        spread = min(poll_restart_spread, len(overdue) * poll_min_interval / poll_batch) if overdue else 0
+        for invoice in overdue:
+            invoice.next_check_at = now + random.uniform(0, spread)
+
+        for invoice in invoices:
+            self.add(invoice)
+
+    def add(self, invoice: Invoice):
+        self.invoices[invoice.message_id] = invoice
+        self.schedule.push(invoice.message_id, invoice.next_check_at)
+
+    def remove(self, message_id: int):
+        self.invoices.pop(message_id, None)
+        self.schedule.discard(message_id)
+
+    async def tick(self, now: float = None) -> int:
+        now = now or time.time()
+        due = [self.invoices[message_id] for message_id in self.schedule.pop_due(now, poll_batch)]
+
+        if not due:
+            return 0
+
+        results = await asyncio.gather(*(self.check(invoice) for invoice in due), return_exceptions=True)
+        self.checks += len(due)
+        rescheduled = []
+
+        for invoice, finished in zip(due, results):
+            if finished is True:
+                self.remove(invoice.message_id)
+                self.finished += 1
+                continue
+
+            if invoice.message_id not in self.invoices:
+                continue
+
+            if isinstance(finished, Exception):
+                invoice.last_error = f"{type(finished).__name__}: {finished}"[:500]
+
+            invoice.check_count += 1
+            invoice.next_check_at = now + next_interval(invoice.check_count)
+            self.schedule.push(invoice.message_id, invoice.next_check_at)
+            rescheduled.append(invoice)
+
+        await reschedule_invoices(rescheduled)
+
+        return len(due)
+
+    async def reconcile(self, now: float = None) -> int:
+        # One paged search for every invoice that reached a final state in the last MAX_AGE seconds,
+        # so the number of PayPal calls stays flat however many invoices are open.
+        if not self.invoices:
+            return 0
+
+        now = now or time.time()
+        cutoff = now - reconcile_max_age
+
+        # Invoices whose send failed are retried here too, the search only sees sent invoices. Ones
+        # older than the search window are looked up on their own, backing off like the poller, so
+        # a single stale invoice doesn't make every search page through months of payments.
+        single = [
+            invoice for invoice in self.invoices.values()
+            if (invoice.state == "created" or (invoice.created_at or now) < cutoff) and invoice.next_check_at <= now
+        ]
+        if single:
+            results = await asyncio.gather(*(self.check(invoice) for invoice in single), return_exceptions=True)
+            self.checks += len(single)
+
+            for invoice, finished in zip(single, results):
+                if finished is True:
+                    self.remove(invoice.message_id)
+                    self.finished += 1
+                elif invoice.message_id in self.invoices:
+                    invoice.check_count += 1
+                    invoice.next_check_at = now + next_interval(invoice.check_count)
+
+            await reschedule_invoices([invoice for invoice in single if invoice.message_id in self.invoices])
+
+        open_invoices = {
+            str(invoice.invoice_id): invoice for invoice in self.invoices.values()
+            if invoice.state != "created" and (invoice.created_at or now) >= cutoff
+        }
+        if not open_invoices:
+            return 0
+
+        oldest = min(invoice.created_at or now for invoice in open_invoices.values())
+        start = datetime.fromtimestamp(oldest - 86400)
+
+        changed = {}
+        offset = 0
+
+        while True:
+            result = await paypal.search_invoices(page=offset, page_size=reconcile_page_size, status=reconcile_statuses, start_invoice_date=f"{start:%Y-%m-%d} PST")
+            self.searches += 1
+
+            page = result.get("invoices", [])
+            for remote in page:
+                invoice = open_invoices.get(remote.get("id"))
+                if invoice:
+                    changed[invoice.message_id] = (invoice, remote.get("status"))
+
+            offset += len(page)
+            if not page or offset >= result.get("total_count", 0) or len(changed) == len(open_invoices):
+                break
+
+        if not changed:
+            return 0
+
+        results = await asyncio.gather(*(self.check(invoice, status) for invoice, status in changed.values()), return_exceptions=True)
+        self.checks += len(changed)
+
+        for (invoice, _), finished in zip(changed.values(), results):
+            if finished is True:
+                self.remove(invoice.message_id)
+                self.finished += 1
+
+        return len(changed)
\ No newline at end of file
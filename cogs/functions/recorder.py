@@ -0,0 +1,100 @@
+import discord
+import asyncio
+import json
+import yaml
+from cogs.functions.transcript import message_data, transcript_chunk
+from cogs.functions.repository import delete_ticket_messages, get_ticket_messages, write_ticket_messages
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+transcript_config = data["Tickets"].get("TRANSCRIPT", {})
+capture_batch = transcript_config.get("CAPTURE_BATCH", 100)
+capture_interval = transcript_config.get("CAPTURE_INTERVAL", 2)
+
+ticket_categories = {section["CATEGORY_ID"] for section in data["Tickets"].values() if isinstance(section, dict) and section.get("CATEGORY_ID")}
+
+def is_ticket_channel(channel) -> bool:
+    # Every ticket lives in one of the configured ticket categories, whatever it's named.
+    return getattr(channel, "category_id", None) in ticket_categories
+
+async def stored_messages(channel_id: int):
+    after = 0
+
+    while True:
+        page = await get_ticket_messages(channel_id, after, transcript_chunk)
+
+        for message in page:
+            yield message
+
+        if len(page) < transcript_chunk:
+            return
+
+        after = page[-1]["id"]
+
+class MessageRecorder:
+    def __init__(self):
+        # Messages are buffered and written in batches, a busy ticket costs one commit every few
+        # seconds instead of one per message.
+        self.pending = {}
+        self.deleted = set()
+        # Channels whose stored copy has everything up to now: caught up since this start, or
+        # opened while the bot was running. Anything else still has to be read from Discord.
+        self.complete = set()
+        self._lock = asyncio.Lock()
+
+        self.recorded = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self.pending) + len(self.deleted)
+
+    @property
+    def full(self) -> bool:
+        return len(self) >= capture_batch
+
+    def record(self, message: discord.Message):
+        self.deleted.discard(message.id)
+        self.pending[message.id] = (message.channel.id, json.dumps(message_data(message), separators=(",", ":")))
+        self.recorded += 1
+
+    def mark_complete(self, channel_id: int):
+        self.complete.add(channel_id)
+
+    def is_complete(self, channel_id: int) -> bool:
+        return channel_id in self.complete
+
+    def forget(self, message_ids):
+        for message_id in message_ids:
+            self.pending.pop(message_id, None)
+            self.deleted.add(message_id)
+
+    async def flush(self):
+        async with self._lock:
+            if not len(self):
+                return
+
+            saved, deleted = self.pending, self.deleted
+            self.pending, self.deleted = {}, set()
+
+            try:
+                await write_ticket_messages(saved, deleted)
+            except Exception:
+                # Anything recorded while the write was failing is newer, so it wins.
+                for message_id, row in saved.items():
+                    if message_id not in self.deleted:
+                        self.pending.setdefault(message_id, row)
+
+                self.deleted |= {message_id for message_id in deleted if message_id not in self.pending}
+                raise
+
+            self.flushes += 1
+
+    async def clear_channel(self, channel_id: int):
+        # Under the lock so a flush already in progress can't write the channel's messages back.
+        async with self._lock:
+            self.complete.discard(channel_id)
+            self.pending = {message_id: row for message_id, row in self.pending.items() if row[0] != channel_id}
+            await delete_ticket_messages(channel_id)
+
+recorder = MessageRecorder()
\ No newline at end of file
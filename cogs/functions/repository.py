@@ -0,0 +1,673 @@
+import yaml
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Optional
+from datetime import datetime
+from cogs.functions.database import database
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+commission_cache_size = data.get("Database", {}).get("COMMISSION_CACHE_SIZE", 1024)
+
+@dataclass(slots=True)
+class Commission:
+    id: int
+    channel_id: int
+    freelancer_channel_id: int
+    freelancer_message_id: int
+    creator_id: int
+    freelancer_id: Optional[int]
+    amount: float
+
+@dataclass(slots=True)
+class Quote:
+    id: int
+    channel_id: int
+    message_id: int
+    freelancer_id: int
+    amount: float
+
+@dataclass(slots=True)
+class Question:
+    id: int
+    channel_id: int
+    message_id: int
+    freelancer_id: int
+    question: str
+
+@dataclass(slots=True)
+class Invoice:
+    channel_id: int
+    message_id: int
+    invoice_id: str
+    amount: float
+    created_at: int
+    next_check_at: float
+    check_count: int
+    state: str
+    attempts: int
+    last_error: Optional[str]
+
+@dataclass(slots=True)
+class Wallet:
+    id: int
+    member_id: int
+    paypal: Optional[str]
+    amount: float
+
+@dataclass(slots=True)
+class Withdrawal:
+    id: int
+    message_id: int
+    freelancer_id: int
+    amount: float
+
+@dataclass(slots=True)
+class LedgerEntry:
+    id: int
+    member_id: int
+    amount: float
+    kind: str
+    reference: Optional[str]
+    balance_after: float
+    created_at: int
+
+@dataclass(slots=True)
+class Profile:
+    id: int
+    member_id: int
+    portfolio: Optional[str]
+    timezone: Optional[str]
+    built_by_bit: Optional[str]
+    description: Optional[str]
+
+@dataclass(slots=True)
+class StoredEmbed:
+    id: int
+    title: Optional[str]
+    description: Optional[str]
+    author: Optional[str]
+    footer: Optional[str]
+    author_image: Optional[str]
+    thumbnail_image: Optional[str]
+    large_image: Optional[str]
+    footer_image: Optional[str]
+    embed_color: Optional[str]
+
+@dataclass(slots=True)
+class Ticket:
+    id: int
+    channel_id: int
+    creator_id: int
+    category: str
+    created_at: int
+    last_activity: Optional[int]
+    closed_at: Optional[int]
+
+@dataclass(slots=True)
+class Backup:
+    id: int
+    path: str
+    created_at: int
+    duration: float
+    pages: int
+    size: int
+    compressed_size: int
+
+# created -> sent -> polling -> paid, with failed (dead-lettered after too many errors) and
+# cancelled as the other ends. Only the open states are loaded into the poller.
+INVOICE_OPEN_STATES = ("created", "sent", "polling")
+
+PROFILE_FIELDS = ("portfolio", "timezone", "built_by_bit", "description")
+
+MISSING = object()
+
+class CommissionCache:
+    def __init__(self, size: int):
+        self.size = size
+        self._by_channel = OrderedDict()
+        self._channel_by_message = {}
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._by_channel)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, channel_id: int):
+        return self._count(self._lookup(channel_id))
+
+    def get_by_message(self, freelancer_message_id: int):
+        channel_id = self._channel_by_message.get(freelancer_message_id)
+        return self._count(self._lookup(channel_id) if channel_id is not None else MISSING)
+
+    def _lookup(self, channel_id: int):
+        commission = self._by_channel.get(channel_id, MISSING)
+
+        if commission is not MISSING:
+            self._by_channel.move_to_end(channel_id)
+
+        return commission
+
+    def _count(self, commission):
+        # Every lookup is counted here exactly once, whichever key it came in by.
+        if commission is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return commission
+
+    def put(self, channel_id: int, commission: Optional[Commission], generation: int):
+        # A write committed while this row was being read, so it may already be stale.
+        if generation != self._generation or self.size <= 0:
+            return
+
+        self._discard(channel_id)
+        self._by_channel[channel_id] = commission
+
+        if commission:
+            self._channel_by_message[commission.freelancer_message_id] = channel_id
+
+        while len(self._by_channel) > self.size:
+            evicted, _ = self._by_channel.popitem(last=False)
+            self._discard(evicted)
+
+    def invalidate(self, channel_id: int = None):
+        self._generation += 1
+        self.invalidations += 1
+
+        if channel_id is None:
+            self._by_channel.clear()
+            self._channel_by_message.clear()
+        else:
+            self._discard(channel_id)
+            self._by_channel.pop(channel_id, None)
+
+    def _discard(self, channel_id: int):
+        commission = self._by_channel.get(channel_id)
+
+        if commission and self._channel_by_message.get(commission.freelancer_message_id) == channel_id:
+            del self._channel_by_message[commission.freelancer_message_id]
+
+commission_cache = CommissionCache(commission_cache_size)
+
+def columns(model, alias: str = None) -> str:
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f"{prefix}{field.name}" for field in fields(model))
+
+def split_row(row: tuple, *models) -> list:
+    # Splits a JOINed row back into one object per model, None for a LEFT JOIN that matched nothing.
+    objects = []
+    offset = 0
+
+    for model in models:
+        width = len(fields(model))
+        values = row[offset:offset + width]
+        objects.append(model(*values) if values[0] is not None else None)
+        offset += width
+
+    return objects
+
+async def fetch_one(model, sql: str, parameters: tuple = ()):
+    async with database.connection() as db:
+        cursor = await db.execute(sql, parameters)
+        row = await cursor.fetchone()
+
+    return model(*row) if row else None
+
+async def fetch_all(model, sql: str, parameters: tuple = ()) -> list:
+    async with database.connection() as db:
+        cursor = await db.execute(sql, parameters)
+        rows = await cursor.fetchall()
+
+    return [model(*row) for row in rows]
+
+# Tickets
+
+async def get_ticket(channel_id: int) -> Optional[Ticket]:
+    return await fetch_one(Ticket, f"SELECT {columns(Ticket)} FROM tickets WHERE channel_id = ?", (channel_id,))
+
+async def add_ticket(channel_id: int, creator_id: int, category: str):
+    now = int(datetime.now().timestamp())
+
+    await database.execute(
+        "INSERT OR IGNORE INTO tickets (channel_id, creator_id, category, created_at, last_activity) VALUES (?, ?, ?, ?, ?)",
+        (channel_id, creator_id, category, now, now)
+    )
+
+# Commissions
+
+async def get_commission(channel_id: int) -> Optional[Commission]:
+    commission = commission_cache.get(channel_id)
+    if commission is not MISSING:
+        return commission
+
+    generation = commission_cache.generation
+    commission = await fetch_one(Commission, f"SELECT {columns(Commission)} FROM commissions WHERE channel_id = ?", (channel_id,))
+    commission_cache.put(channel_id, commission, generation)
+
+    return commission
+
+async def get_commission_by_message(freelancer_message_id: int) -> Optional[Commission]:
+    commission = commission_cache.get_by_message(freelancer_message_id)
+    if commission is not MISSING:
+        return commission
+
+    generation = commission_cache.generation
+    commission = await fetch_one(Commission, f"SELECT {columns(Commission)} FROM commissions WHERE freelancer_message_id = ?", (freelancer_message_id,))
+    if commission:
+        commission_cache.put(commission.channel_id, commission, generation)
+
+    return commission
+
+async def get_commission_with_profile(freelancer_message_id: int, member_id: int) -> tuple:
+    generation = commission_cache.generation
+
+    async with database.connection() as db:
+        cursor = await db.execute(
+            f"""
+            SELECT {columns(Commission, 'c')}, {columns(Profile, 'p')}
+            FROM commissions c
+            LEFT JOIN profiles p ON p.member_id = ?
+            WHERE c.freelancer_message_id = ?
+            """,
+            (member_id, freelancer_message_id)
+        )
+        row = await cursor.fetchone()
+
+    if not row:
+        return None, None
+
+    commission, profile = split_row(row, Commission, Profile)
+    commission_cache.put(commission.channel_id, commission, generation)
+
+    return commission, profile
+
+async def add_commission(channel_id: int, freelancer_channel_id: int, freelancer_message_id: int, creator_id: int):
+    await database.execute(
+        """
+        INSERT INTO commissions (channel_id, freelancer_channel_id, freelancer_message_id, creator_id)
+        VALUES (?, ?, ?, ?)
+        """,
+        (channel_id, freelancer_channel_id, freelancer_message_id, creator_id)
+    )
+    commission_cache.invalidate(channel_id)
+
+async def set_commission_freelancer(channel_id: int, freelancer_id: int):
+    await database.execute("UPDATE commissions SET freelancer_id = ? WHERE channel_id = ?", (freelancer_id, channel_id))
+    commission_cache.invalidate(channel_id)
+
+async def close_commission(channel_id: int) -> tuple:
+    # Reads, credits and deletes in one writer transaction, so an invoice paid while the
+    # ticket was being archived is still counted and nothing is left half-cleared.
+    async def operation(db):
+        cursor = await db.execute(f"SELECT {columns(Commission)} FROM commissions WHERE channel_id = ?", (channel_id,))
+        row = await cursor.fetchone()
+        commission = Commission(*row) if row else None
+        balance = None
+
+        if commission and commission.freelancer_id and commission.amount > 0:
+            balance = await post_ledger_entry(db, commission.freelancer_id, commission.amount, "commission", f"ticket:{channel_id}")
+
+        for table in ("commissions", "questions", "quotes", "invoices"):
+            await db.execute(f"DELETE FROM {table} WHERE channel_id = ?", (channel_id,))
+
+        # The ticket row is kept for reporting, only marked as closed.
+        await db.execute("UPDATE tickets SET closed_at = ? WHERE channel_id = ?", (int(datetime.now().timestamp()), channel_id))
+
+        return commission, balance
+
+    try:
+        return await database.transaction(operation)
+    finally:
+        commission_cache.invalidate(channel_id)
+
+# Quotes and questions
+
+async def get_quote_with_commission(message_id: int) -> tuple:
+    async with database.connection() as db:
+        cursor = await db.execute(
+            f"""
+            SELECT {columns(Quote, 'q')}, {columns(Commission, 'c')}
+            FROM quotes q
+            LEFT JOIN commissions c ON c.channel_id = q.channel_id
+            WHERE q.message_id = ?
+            """,
+            (message_id,)
+        )
+        row = await cursor.fetchone()
+
+    return split_row(row, Quote, Commission) if row else (None, None)
+
+async def get_quotes(channel_id: int) -> list:
+    return await fetch_all(Quote, f"SELECT {columns(Quote)} FROM quotes WHERE channel_id = ?", (channel_id,))
+
+async def add_quote(channel_id: int, message_id: int, freelancer_id: int, amount: float):
+    await database.execute(
+        """
+        INSERT INTO quotes (channel_id, message_id, freelancer_id, amount)
+        VALUES (?, ?, ?, ?)
+        """,
+        (channel_id, message_id, freelancer_id, amount)
+    )
+
+async def get_question(message_id: int) -> Optional[Question]:
+    return await fetch_one(Question, f"SELECT {columns(Question)} FROM questions WHERE message_id = ?", (message_id,))
+
+async def add_question(channel_id: int, message_id: int, freelancer_id: int, question: str):
+    await database.execute(
+        """
+        INSERT INTO questions (channel_id, message_id, freelancer_id, question)
+        VALUES (?, ?, ?, ?)
+        """,
+        (channel_id, message_id, freelancer_id, question)
+    )
+
+# Invoices
+
+async def get_invoices() -> list:
+    return await fetch_all(
+        Invoice,
+        f"SELECT {columns(Invoice)} FROM invoices WHERE state IN ({', '.join('?' * len(INVOICE_OPEN_STATES))}) ORDER BY next_check_at",
+        INVOICE_OPEN_STATES
+    )
+
+async def count_channel_invoices(channel_id: int) -> int:
+    async with database.connection() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM invoices WHERE channel_id = ?", (channel_id,))
+        (count,) = await cursor.fetchone()
+
+    return count
+
+async def get_failed_invoices(limit: int = 25) -> list:
+    return await fetch_all(Invoice, f"SELECT {columns(Invoice)} FROM invoices WHERE state = 'failed' ORDER BY created_at DESC LIMIT ?", (limit,))
+
+async def add_invoice(channel_id: int, message_id: int, invoice_id: str, amount: float, next_check_at: float, state: str = "sent") -> Invoice:
+    invoice = Invoice(channel_id, message_id, invoice_id, amount, int(datetime.now().timestamp()), next_check_at, 0, state, 0, None)
+
+    await database.execute(
+        f"INSERT INTO invoices ({columns(Invoice)}) VALUES ({', '.join('?' * len(fields(Invoice)))})",
+        tuple(getattr(invoice, field.name) for field in fields(Invoice))
+    )
+
+    return invoice
+
+async def reschedule_invoices(invoices: list):
+    if not invoices:
+        return
+
+    await database.batch([
+        (
+            "UPDATE invoices SET next_check_at = ?, check_count = ?, state = ?, attempts = ?, last_error = ? WHERE message_id = ? AND state IN ('created', 'sent', 'polling')",
+            (invoice.next_check_at, invoice.check_count, invoice.state, invoice.attempts, invoice.last_error, invoice.message_id)
+        )
+        for invoice in invoices
+    ])
+
+async def set_invoice_state(invoice: Invoice, state: str, last_error: str = None):
+    invoice.state = state
+    invoice.last_error = last_error
+
+    await database.execute(
+        "UPDATE invoices SET state = ?, attempts = ?, last_error = ? WHERE message_id = ?",
+        (state, invoice.attempts, last_error, invoice.message_id)
+    )
+
+async def requeue_invoice(invoice_id: str, next_check_at: float) -> Optional[Invoice]:
+    cursor = await database.execute(
+        "UPDATE invoices SET state = 'polling', attempts = 0, check_count = 0, last_error = NULL, next_check_at = ? WHERE invoice_id = ? AND state = 'failed'",
+        (next_check_at, invoice_id)
+    )
+
+    return await get_invoice_by_paypal_id(invoice_id) if cursor.rowcount else None
+
+async def get_invoice_by_paypal_id(invoice_id: str) -> Optional[Invoice]:
+    return await fetch_one(Invoice, f"SELECT {columns(Invoice)} FROM invoices WHERE invoice_id = ?", (invoice_id,))
+
+async def mark_invoice_paid(invoice: Invoice) -> bool:
+    # The webhook and the poller can both see the same payment, only whichever moves the invoice
+    # to paid first credits the commission.
+    async def operation(db):
+        cursor = await db.execute("UPDATE invoices SET state = 'paid', last_error = NULL WHERE message_id = ? AND state NOT IN ('paid', 'cancelled')", (invoice.message_id,))
+        if cursor.rowcount == 0:
+            return False
+
+        await db.execute("UPDATE commissions SET amount = amount + ? WHERE channel_id = ?", (invoice.amount, invoice.channel_id))
+        return True
+
+    try:
+        paid = await database.transaction(operation)
+    finally:
+        commission_cache.invalidate(invoice.channel_id)
+
+    if paid:
+        invoice.state = "paid"
+
+    return paid
+
+# Wallets and withdrawals
+
+async def get_wallet(member_id: int) -> Optional[Wallet]:
+    return await fetch_one(Wallet, f"SELECT {columns(Wallet)} FROM wallets WHERE member_id = ?", (member_id,))
+
+async def set_wallet_paypal(member_id: int, paypal: str):
+    await database.execute(
+        """
+        INSERT INTO wallets (member_id, paypal)
+        VALUES (?, ?)
+        ON CONFLICT(member_id) DO UPDATE SET
+            paypal = excluded.paypal
+        """,
+        (member_id, paypal)
+    )
+
+async def post_ledger_entry(db, member_id: int, amount: float, kind: str, reference: str = None) -> float:
+    # Must run inside a writer transaction, the ledger row and the materialized balance always
+    # change together so the latest balance_after is the wallet's balance.
+    await db.execute(
+        """
+        INSERT INTO wallets (member_id, amount) VALUES (?, ?)
+        ON CONFLICT (member_id) DO UPDATE SET amount = amount + excluded.amount
+        """,
+        (member_id, amount)
+    )
+    cursor = await db.execute("SELECT amount FROM wallets WHERE member_id = ?", (member_id,))
+    (balance,) = await cursor.fetchone()
+
+    await db.execute(
+        """
+        INSERT INTO wallet_ledger (member_id, amount, kind, reference, balance_after, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (member_id, amount, kind, reference, balance, int(datetime.now().timestamp()))
+    )
+
+    return balance
+
+async def get_ledger(member_id: int, limit: int = 10) -> list:
+    return await fetch_all(
+        LedgerEntry,
+        f"SELECT {columns(LedgerEntry)} FROM wallet_ledger WHERE member_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+        (member_id, limit)
+    )
+
+async def get_wallet_mismatches() -> list:
+    # Every balance should equal the balance_after of its member's newest ledger entry. That entry
+    # comes straight off the (member_id, created_at) index, so this never scans the whole ledger.
+    async with database.connection() as db:
+        cursor = await db.execute(
+            """
+            SELECT member_id, balance, balance_after FROM (
+                SELECT w.member_id, w.amount AS balance, (
+                    SELECT l.balance_after FROM wallet_ledger l
+                    WHERE l.member_id = w.member_id
+                    ORDER BY l.created_at DESC, l.id DESC LIMIT 1
+                ) AS balance_after
+                FROM wallets w
+            )
+            WHERE ABS(balance - COALESCE(balance_after, 0)) > 0.005
+            """
+        )
+        return await cursor.fetchall()
+
+async def request_withdrawal(member_id: int) -> Optional[Withdrawal]:
+    # Debits the whole balance before anything is posted to Discord, so two clicks can't both
+    # request the same money. The message id is attached once the request has been sent.
+    async def operation(db):
+        cursor = await db.execute("SELECT amount FROM wallets WHERE member_id = ?", (member_id,))
+        row = await cursor.fetchone()
+
+        if not row or row[0] <= 0:
+            return None
+
+        amount = row[0]
+        cursor = await db.execute("INSERT INTO withdrawals (message_id, freelancer_id, amount) VALUES (NULL, ?, ?)", (member_id, amount))
+        withdrawal = Withdrawal(cursor.lastrowid, None, member_id, amount)
+
+        await post_ledger_entry(db, member_id, -amount, "withdrawal", f"withdrawal:{withdrawal.id}")
+
+        return withdrawal
+
+    return await database.transaction(operation)
+
+async def set_withdrawal_message(withdrawal_id: int, message_id: int):
+    await database.execute("UPDATE withdrawals SET message_id = ? WHERE id = ?", (message_id, withdrawal_id))
+
+async def cancel_withdrawal(withdrawal: Withdrawal) -> float:
+    async def operation(db):
+        await db.execute("DELETE FROM withdrawals WHERE id = ?", (withdrawal.id,))
+        return await post_ledger_entry(db, withdrawal.freelancer_id, withdrawal.amount, "withdrawal_reversal", f"withdrawal:{withdrawal.id}")
+
+    return await database.transaction(operation)
+
+async def get_withdrawal(message_id: int) -> Optional[Withdrawal]:
+    return await fetch_one(Withdrawal, f"SELECT {columns(Withdrawal)} FROM withdrawals WHERE message_id = ?", (message_id,))
+
+async def delete_withdrawal(message_id: int):
+    await database.execute("DELETE FROM withdrawals WHERE message_id = ?", (message_id,))
+
+# Profiles
+
+async def get_profile(member_id: int) -> Optional[Profile]:
+    return await fetch_one(Profile, f"SELECT {columns(Profile)} FROM profiles WHERE member_id = ?", (member_id,))
+
+async def set_profile_field(member_id: int, field: str, value: str):
+    if field not in PROFILE_FIELDS:
+        raise ValueError(f"Unknown profile field: {field}")
+
+    await database.execute(
+        f"""
+        INSERT INTO profiles (member_id, {field})
+        VALUES (?, ?)
+        ON CONFLICT(member_id) DO UPDATE SET
+            {field} = excluded.{field}
+        """,
+        (member_id, value)
+    )
+
+# Embeds
+
+async def get_embed(embed_id: int) -> Optional[StoredEmbed]:
+    return await fetch_one(StoredEmbed, f"SELECT {columns(StoredEmbed)} FROM embeds WHERE id = ?", (embed_id,))
+
+async def get_embeds() -> list:
+    return await fetch_all(StoredEmbed, f"SELECT {columns(StoredEmbed)} FROM embeds")
+
+async def add_embed(title: str, description: str, author: str, footer: str, author_image: str, thumbnail_image: str, large_image: str, footer_image: str, embed_color: str) -> int:
+    cursor = await database.execute(
+        """
+        INSERT INTO embeds (title, description, author, footer, author_image,
+        thumbnail_image, large_image, footer_image, embed_color)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (title, description, author, footer, author_image, thumbnail_image, large_image, footer_image, embed_color)
+    )
+
+    return cursor.lastrowid
+
+async def delete_embed(embed_id: int) -> bool:
+    cursor = await database.execute("DELETE FROM embeds WHERE id = ?", (embed_id,))
+    return cursor.rowcount > 0
+
+
+# Backups
+
+async def get_backups(limit: int = 10) -> list:
+    return await fetch_all(Backup, f"SELECT {columns(Backup)} FROM backups ORDER BY id DESC LIMIT ?", (limit,))
+
+async def add_backup(path: str, created_at: int, duration: float, pages: int, size: int, compressed_size: int):
+    await database.execute(
+        "INSERT INTO backups (path, created_at, duration, pages, size, compressed_size) VALUES (?, ?, ?, ?, ?, ?)",
+        (path, created_at, duration, pages, size, compressed_size)
+    )
+
+# Ticket messages
+
+async def write_ticket_messages(saved: dict, deleted: set):
+    # saved maps message IDs to (channel_id, data), one commit covers a whole batch of messages.
+    statements = [
+        (
+            "INSERT INTO ticket_messages (message_id, channel_id, data) VALUES (?, ?, ?) ON CONFLICT (message_id) DO UPDATE SET data = excluded.data",
+            (message_id, channel_id, message)
+        )
+        for message_id, (channel_id, message) in saved.items()
+    ]
+    statements.extend(("DELETE FROM ticket_messages WHERE message_id = ?", (message_id,)) for message_id in deleted)
+
+    await database.batch(statements)
+
+async def get_ticket_messages(channel_id: int, after: int = 0, limit: int = 500) -> list:
+    async with database.connection() as db:
+        cursor = await db.execute(
+            "SELECT data FROM ticket_messages WHERE channel_id = ? AND message_id > ? ORDER BY message_id LIMIT ?",
+            (channel_id, after, limit)
+        )
+        rows = await cursor.fetchall()
+
+    return [json.loads(row[0]) for row in rows]
+
+async def get_ticket_checkpoints() -> dict:
+    async with database.connection() as db:
+        cursor = await db.execute("SELECT channel_id, MAX(message_id) FROM ticket_messages GROUP BY channel_id")
+        rows = await cursor.fetchall()
+
+    return dict(rows)
+
+async def delete_ticket_messages(channel_id: int):
+    await database.execute("DELETE FROM ticket_messages WHERE channel_id = ?", (channel_id,))
+
+# Ticket deadlines
+
+async def get_ticket_deadlines() -> dict:
+    async with database.connection() as db:
+        cursor = await db.execute("SELECT channel_id, deadline FROM ticket_deadlines")
+        rows = await cursor.fetchall()
+
+    return dict(rows)
+
+async def write_ticket_deadlines(saved: dict, deleted: set, activity: dict = None):
+    statements = [
+        (
+            "INSERT INTO ticket_deadlines (channel_id, deadline) VALUES (?, ?) ON CONFLICT (channel_id) DO UPDATE SET deadline = excluded.deadline",
+            (channel_id, deadline)
+        )
+        for channel_id, deadline in saved.items()
+    ]
+    statements.extend(("DELETE FROM ticket_deadlines WHERE channel_id = ?", (channel_id,)) for channel_id in deleted)
+    statements.extend(("UPDATE tickets SET last_activity = ? WHERE channel_id = ?", (int(when), channel_id)) for channel_id, when in (activity or {}).items())
+
+    await database.batch(statements)
\ No newline at end of file
@@ -0,0 +1,57 @@
+import heapq
+import itertools
+from typing import Optional
+
+class Schedule:
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key) -> bool:
+        return key in self._due
+
+    def push(self, key, when: float):
+        # Rescheduling leaves the old heap entry behind, it is skipped when it no longer matches
+        # _due rather than searched for and removed.
+        self._due[key] = when
+        heapq.heappush(self._heap, (when, next(self._counter), key))
+
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [entry for entry in self._heap if self._due.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+
+    def discard(self, key):
+        self._due.pop(key, None)
+
+    def due_at(self, key) -> Optional[float]:
+        return self._due.get(key)
+
+    def next_due(self) -> Optional[float]:
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int = None) -> list:
+        keys = []
+
+        while self._heap and (limit is None or len(keys) < limit):
+            self._prune()
+            if not self._heap or self._heap[0][0] > now:
+                break
+
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            keys.append(key)
+
+        return keys
+
+    def _prune(self):
+        while self._heap:
+            when, _, key = self._heap[0]
+            if self._due.get(key) == when:
+                return
+
+            heapq.heappop(self._heap)
\ No newline at end of file
@@ -1,238 +1,129 @@
 import discord
-import aiosqlite
+import asyncio
 import sqlite3
+import shutil
+import gzip
 import yaml
-from discord.ext import commands
+import time
+import os
+from discord.ext import commands, tasks
 from discord import app_commands
+from datetime import datetime
 from typing import Literal
+from cogs.functions.database import database, busy_timeout
+from cogs.functions.migrations import migrate, expected_schema
+from cogs.functions.repository import add_backup, commission_cache, get_backups
+from cogs.functions.transcript import transcripts
+from cogs.functions.recorder import recorder
+from cogs.functions.utils import close_step_times
+from cogs.functions.timers import ticket_timers
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
 
 guild_id = data["General"]["GUILD_ID"]
 embed_color = data["General"]["EMBED_COLOR"]
+backup_config = data.get("Database", {})
+backup_dir = backup_config.get("BACKUP_DIR", "backups")
+backup_interval = backup_config.get("BACKUP_INTERVAL", 360)
+backup_keep = backup_config.get("BACKUP_KEEP", 14)
+backup_pages = backup_config.get("BACKUP_PAGES", 1024)
+backup_sleep = backup_config.get("BACKUP_SLEEP", 10) / 1000
 
-async def check_tables():
-    await commissions()
-    await embeds()
-    await invoices()
-    await profiles()
-    await wallets()
-    await withdrawals()
-    await questions()
-    await quotes()
+async def check_tables() -> float:
+    started = time.perf_counter()
+
+    async with database.connection() as db:
+        result = await migrate(db)
+
+    if result["applied"]:
+        print(f'Applied database migrations: {", ".join(str(version) for version in result["applied"])}')
+    if result["created"]:
+        print(f'Recreated missing database objects: {", ".join(result["created"])}')
+
+    return time.perf_counter() - started
 
 async def refresh_table(table: str):
-    if table == "Commissions":
-        await commissions(True)
-    if table == "Embeds":
-        await embeds(True)
-    elif table == "Invoices":
-        await invoices(True) 
-    elif table == "Profiles":
-        await profiles(True)
-    elif table == "Wallets":
-        await wallets(True)
-    elif table == "Withdrawals":
-        await withdrawals(True)
-    elif table == "Questions":
-        await questions(True)
-    elif table == "Quotes":
-        await quotes(True)
-
-async def embeds(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE embeds')
-                await db.commit()
-            except sqlite3.OperationalError:
-                pass
+    name = table.lower()
+    statements = [statement for _, _, table_name, statement in expected_schema() if table_name == name]
 
-        try:
-            await db.execute('SELECT * FROM embeds')
-        except sqlite3.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS embeds (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT,
-                    description TEXT,
-                    author TEXT,
-                    footer TEXT,
-                    author_image TEXT,
-                    thumbnail_image TEXT,
-                    large_image TEXT,
-                    footer_image TEXT,
-                    embed_color TEXT
-                )
-            """)
-            await db.commit()
-
-async def invoices(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE invoices')
-                await db.commit()
-            except sqlite3.OperationalError:
-                pass
+    async def operation(db):
+        await db.execute(f"DROP TABLE IF EXISTS {name}")
+        for statement in statements:
+            await db.execute(statement)
 
-        try:
-            await db.execute('SELECT * FROM invoices')
-        except sqlite3.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS invoices (
-                    channel_id INTEGER,
-                    message_id INTEGER,
-                    invoice_id INTEGER,
-                    amount INTEGER
-                )
-            """)
-            await db.commit()
-
-async def profiles(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE profiles')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+    await database.transaction(operation)
 
-        try:
-            await db.execute('SELECT * FROM profiles')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS profiles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    member_id INTEGER UNIQUE,
-                    portfolio TEXT DEFAULT NULL,
-                    timezone TEXT DEFAULT NULL,
-                    built_by_bit TEXT DEFAULT NULL,
-                    description TEXT DEFAULT NULL
-                )
-            """)
-            await db.commit()
-
-async def wallets(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE wallets')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+    if name == "commissions":
+        commission_cache.invalidate()
 
-        try:
-            await db.execute('SELECT * FROM wallets')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS wallets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    member_id INTEGER UNIQUE,
-                    paypal TEXT DEFAULT NULL,
-                    amount INTEGER DEFAULT 0
-                )
-            """)
-            await db.commit()
-
-async def commissions(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE commissions')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+def backup_database(target: str) -> tuple:
+    partial = f"{target}.partial"
+    source = sqlite3.connect(database.path, timeout=busy_timeout / 1000)
+    destination = sqlite3.connect(partial)
 
-        try:
-            await db.execute('SELECT * FROM commissions')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS commissions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    channel_id INTEGER UNIQUE,
-                    freelancer_channel_id INTEGER,
-                    freelancer_message_id INTEGER,
-                    creator_id INTEGER,
-                    freelancer_id INTEGER DEFAULT NULL,
-                    amount INTEGER DEFAULT 0
-                )
-            """)
-            await db.commit()
-
-async def questions(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE questions')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+    try:
+        # Copies a chunk of pages at a time and sleeps in between, so the writer is never locked
+        # out for long and a write mid-copy can't leave a torn file.
+        source.backup(destination, pages=backup_pages, sleep=backup_sleep)
+        (pages,) = destination.execute("PRAGMA page_count").fetchone()
+    finally:
+        destination.close()
+        source.close()
 
-        try:
-            await db.execute('SELECT * FROM questions')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS questions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    channel_id INTEGER,
-                    message_id INTEGER,
-                    freelancer_id INTEGER,
-                    question TEXT
-                )
-            """)
-            await db.commit()
-
-async def quotes(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE quotes')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+    try:
+        with open(partial, "rb") as raw, gzip.open(f"{target}.partial.gz", "wb") as compressed:
+            shutil.copyfileobj(raw, compressed)
 
-        try:
-            await db.execute('SELECT * FROM quotes')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS quotes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    channel_id INTEGER,
-                    message_id INTEGER,
-                    freelancer_id INTEGER,
-                    amount INTEGER
-                )
-            """)
-            await db.commit()
-
-async def withdrawals(delete: bool = False):
-    async with aiosqlite.connect('database.db') as db:
-        if delete:
-            try:
-                await db.execute('DROP TABLE withdrawals')
-                await db.commit()
-            except aiosqlite.OperationalError:
-                pass
+        size = os.path.getsize(partial)
+        os.replace(f"{target}.partial.gz", target)
+    finally:
+        os.remove(partial)
 
-        try:
-            await db.execute('SELECT * FROM withdrawals')
-        except aiosqlite.OperationalError:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS withdrawals (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    message_id INTEGER,
-                    freelancer_id INTEGER,
-                    amount INTEGER
-                )
-            """)
-            await db.commit()
+    return pages, size, os.path.getsize(target)
+
+def rotate_backups():
+    backups = sorted(name for name in os.listdir(backup_dir) if name.startswith("database-") and name.endswith(".db.gz"))
+
+    for name in backups[:-backup_keep] if backup_keep > 0 else []:
+        os.remove(os.path.join(backup_dir, name))
+
+async def take_backup():
+    os.makedirs(backup_dir, exist_ok=True)
+
+    created_at = datetime.now()
+    target = os.path.join(backup_dir, f"database-{created_at:%Y%m%d-%H%M%S}.db.gz")
+    started = time.perf_counter()
+
+    pages, size, compressed_size = await asyncio.to_thread(backup_database, target)
+    duration = time.perf_counter() - started
+
+    await add_backup(target, int(created_at.timestamp()), duration, pages, size, compressed_size)
+    await asyncio.to_thread(rotate_backups)
 
 class SQLiteCog(commands.Cog):
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
 
+    def cog_load(self):
+        if backup_interval > 0:
+            self.backup_loop.change_interval(minutes=backup_interval)
+            self.backup_loop.start()
+
+    def cog_unload(self):
+        self.backup_loop.cancel()
+
+    @tasks.loop(minutes = 360)
+    async def backup_loop(self):
+        try:
+            await take_backup()
+        except Exception as error:
+            print(f'Database backup failed: {error}')
+
+    @backup_loop.before_loop
+    async def before_backup_loop(self):
+        await self.bot.wait_until_ready()
+
     @app_commands.command(name="refreshtable", description="Refreshes a SQLite table!")
     @app_commands.describe(table="What table should be refreshed?")
     @app_commands.default_permissions(administrator=True)
@@ -247,5 +138,39 @@ class SQLiteCog(commands.Cog):
         
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="dbstats", description="Shows database and cache statistics!")
+    @app_commands.default_permissions(administrator=True)
+    async def dbstats(self, interaction: discord.Interaction) -> None:
+        await interaction.response.defer(thinking=True, ephemeral=True)
+
+        if await self.bot.is_owner(interaction.user):
+            embed = discord.Embed(title="Database Statistics", color=discord.Color.from_str(embed_color))
+            embed.add_field(name="Commission Cache", value=f"**Entries:** {len(commission_cache)}/{commission_cache.size}\n**Hits:** {commission_cache.hits}\n**Misses:** {commission_cache.misses}\n**Hit Rate:** {commission_cache.hit_rate:.1%}\n**Invalidations:** {commission_cache.invalidations}")
+            embed.add_field(name="Writer", value=f"**Commits:** {database.commits}\n**Writes:** {database.writes}")
+
+            invoices = self.bot.get_cog("InvoiceCog")
+            if invoices:
+                embed.add_field(name="Invoice Polling", value=f"**Open:** {len(invoices.poller)}\n**Checks:** {invoices.poller.checks}\n**Searches:** {invoices.poller.searches}\n**Paid/Closed:** {invoices.poller.finished}\n**Discord Calls Saved:** {invoices.discord_calls_saved}")
+
+            if transcripts.jobs:
+                embed.add_field(name="Transcripts", value=f"**Exported:** {transcripts.exports}\n**Messages:** {transcripts.messages}\n**Chunks Rendered:** {transcripts.jobs}\n**Failed:** {transcripts.failed}\n**Average Render:** {transcripts.render_time / transcripts.jobs:.2f}s\n**Slowest Render:** {transcripts.max_render_time:.2f}s\n**Average Wait:** {transcripts.wait_time / transcripts.jobs:.2f}s")
+
+            embed.add_field(name="Message Capture", value=f"**Recorded:** {recorder.recorded}\n**Pending:** {len(recorder)}\n**Flushes:** {recorder.flushes}")
+
+            next_due = ticket_timers.schedule.next_due()
+            embed.add_field(name="Ticket Inactivity", value=f"**Tracked:** {len(ticket_timers)}\n**Activity Updates:** {ticket_timers.touches}\n**Re-armed:** {ticket_timers.rearmed}\n**Next Check:** {f'<t:{int(next_due)}:R>' if next_due else 'None'}")
+
+            if close_step_times:
+                embed.add_field(name="Ticket Closing", value="\n".join(f"**{name.replace('_', ' ').title()}:** {total / count:.2f}s avg, {slowest:.2f}s max" for name, (count, total, slowest) in close_step_times.items()))
+
+            backups = await get_backups(1)
+            if backups:
+                backup = backups[0]
+                embed.add_field(name="Last Backup", value=f"**Taken:** <t:{backup.created_at}:R>\n**Duration:** {backup.duration:.2f}s\n**Size:** {backup.size / 1048576:.2f} MiB\n**Compressed:** {backup.compressed_size / 1048576:.2f} MiB")
+        else:
+            embed = discord.Embed(description="You do not have permission to use this command!", color=discord.Color.red())
+
+        await interaction.followup.send(embed=embed)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(SQLiteCog(bot))
\ No newline at end of file
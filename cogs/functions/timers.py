@@ -0,0 +1,118 @@
+import asyncio
+import yaml
+import time
+from cogs.functions.schedule import Schedule
+from cogs.functions.repository import get_ticket_deadlines, write_ticket_deadlines
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+inactivity_config = data["Tickets"].get("INACTIVITY", {})
+inactivity_enabled = inactivity_config.get("ENABLED", False)
+inactivity_hours = inactivity_config.get("HOURS", 24)
+inactivity_check_interval = inactivity_config.get("CHECK_INTERVAL", 60)
+inactivity_close_batch = inactivity_config.get("CLOSE_BATCH", 5)
+inactivity_close_delay = inactivity_config.get("CLOSE_DELAY", 2)
+inactivity_retry_delay = inactivity_config.get("RETRY_DELAY", 3600)
+inactivity_flush_interval = inactivity_config.get("FLUSH_INTERVAL", 30)
+
+class TicketTimers:
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.schedule = Schedule()
+        # The latest deadline of every ticket. The schedule can hold an older one, it's moved
+        # forward when it comes due instead of on every message.
+        self.deadlines = {}
+        self.activity = {}
+        self.dirty = set()
+        self.removed = set()
+        self._lock = asyncio.Lock()
+
+        self.touches = 0
+        self.rearmed = 0
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self.deadlines
+
+    async def load(self):
+        for channel_id, deadline in (await get_ticket_deadlines()).items():
+            self.deadlines[channel_id] = deadline
+            self.schedule.push(channel_id, deadline)
+
+    def set_deadline(self, channel_id: int, deadline: float):
+        if channel_id not in self.schedule or deadline < self.schedule.due_at(channel_id):
+            self.schedule.push(channel_id, deadline)
+
+        self.deadlines[channel_id] = deadline
+        self.dirty.add(channel_id)
+        self.removed.discard(channel_id)
+
+    def touch(self, channel_id: int, now: float = None):
+        # A dict write for the usual case of an active ticket, the heap is only touched when the
+        # ticket isn't scheduled yet.
+        now = now or time.time()
+
+        self.set_deadline(channel_id, now + self.timeout)
+        self.activity[channel_id] = now
+        self.touches += 1
+
+    def postpone(self, channel_id: int, delay: float, now: float = None):
+        self.set_deadline(channel_id, (now or time.time()) + delay)
+
+    def remove(self, channel_id: int):
+        self.deadlines.pop(channel_id, None)
+        self.activity.pop(channel_id, None)
+        self.schedule.discard(channel_id)
+        self.dirty.discard(channel_id)
+        self.removed.add(channel_id)
+
+    def pop_expired(self, now: float = None, limit: int = None) -> list:
+        now = now or time.time()
+        expired = []
+
+        while limit is None or len(expired) < limit:
+            due = self.schedule.pop_due(now, None if limit is None else limit - len(expired))
+            if not due:
+                break
+
+            for channel_id in due:
+                deadline = self.deadlines.get(channel_id)
+
+                if deadline is None:
+                    continue
+
+                if deadline > now:
+                    # There was activity since this entry was pushed.
+                    self.schedule.push(channel_id, deadline)
+                    self.rearmed += 1
+                else:
+                    expired.append(channel_id)
+
+        return expired
+
+    async def flush(self):
+        async with self._lock:
+            if not self.dirty and not self.removed:
+                return
+
+            saved = {channel_id: self.deadlines[channel_id] for channel_id in self.dirty if channel_id in self.deadlines}
+            removed, activity = self.removed, self.activity
+            self.dirty, self.removed, self.activity = set(), set(), {}
+
+            try:
+                # The last activity is saved on the ticket too, in the same commit.
+                await write_ticket_deadlines(saved, removed, activity)
+            except Exception:
+                self.dirty |= saved.keys() - self.removed
+                self.removed |= removed - self.deadlines.keys()
+                for channel_id, when in activity.items():
+                    self.activity.setdefault(channel_id, when)
+                raise
+
+            self.flushes += 1
+
+ticket_timers = TicketTimers(inactivity_hours * 3600)
\ No newline at end of file
@@ -0,0 +1,440 @@
+import discord
+import asyncio
+import threading
+import tempfile
+import gzip
+import html
+import yaml
+import time
+import re
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+transcript_config = data["Tickets"].get("TRANSCRIPT", {})
+transcript_workers = transcript_config.get("WORKERS", 2)
+transcript_queue = transcript_config.get("QUEUE", 4)
+transcript_timezone = transcript_config.get("TIMEZONE", "MST")
+transcript_chunk = transcript_config.get("CHUNK", 500)
+transcript_compress = transcript_config.get("COMPRESS", False)
+transcript_spool_size = transcript_config.get("SPOOL_SIZE", 4194304)
+
+STYLE = """
+body { background: #313338; color: #dbdee1; font-family: "gg sans", "Helvetica Neue", Helvetica, Arial, sans-serif; font-size: 16px; margin: 0; }
+header { background: #2b2d31; padding: 16px 24px; border-bottom: 1px solid #1e1f22; }
+header h1 { margin: 0; font-size: 20px; color: #f2f3f5; }
+header p { margin: 4px 0 0; color: #949ba4; font-size: 13px; }
+main { padding: 8px 0 24px; }
+.group { display: flex; padding: 8px 24px 2px; }
+.group:hover, .continued:hover { background: #2e3035; }
+.avatar { width: 40px; height: 40px; border-radius: 50%; margin-right: 16px; flex-shrink: 0; }
+.body { min-width: 0; flex: 1; }
+.author { color: #f2f3f5; font-weight: 600; }
+.tag { background: #5865f2; color: #fff; border-radius: 3px; font-size: 10px; padding: 1px 4px; margin-left: 4px; vertical-align: middle; }
+.time { color: #949ba4; font-size: 12px; margin-left: 6px; }
+.continued { padding: 2px 24px 2px 80px; }
+.content { white-space: normal; word-wrap: break-word; line-height: 1.375; }
+.edited { color: #949ba4; font-size: 10px; margin-left: 4px; }
+.reply { color: #949ba4; font-size: 13px; margin-bottom: 2px; }
+pre { background: #2b2d31; border: 1px solid #1e1f22; border-radius: 4px; padding: 8px; white-space: pre-wrap; }
+code { background: #2b2d31; border-radius: 3px; padding: 0 3px; font-size: 14px; }
+a { color: #00a8fc; }
+.attachment img { max-width: 400px; max-height: 300px; border-radius: 4px; margin-top: 4px; display: block; }
+.file { display: inline-block; background: #2b2d31; border: 1px solid #1e1f22; border-radius: 4px; padding: 8px 12px; margin-top: 4px; }
+.embed { background: #2b2d31; border-left: 4px solid #1e1f22; border-radius: 4px; padding: 8px 16px 12px 12px; margin-top: 4px; max-width: 520px; }
+.embed-author { font-size: 14px; font-weight: 600; margin-top: 4px; }
+.embed-title { color: #f2f3f5; font-weight: 600; margin-top: 4px; }
+.embed-description { font-size: 14px; margin-top: 4px; }
+.embed-fields { display: flex; flex-wrap: wrap; }
+.embed-field { font-size: 14px; margin-top: 8px; flex-basis: 100%; }
+.embed-field.inline { flex-basis: 33%; }
+.embed-field-name { font-weight: 600; color: #f2f3f5; }
+.embed-image img { max-width: 100%; border-radius: 4px; margin-top: 8px; }
+.embed-footer { color: #949ba4; font-size: 12px; margin-top: 8px; }
+footer { color: #949ba4; font-size: 13px; padding: 16px 24px; border-top: 1px solid #1e1f22; }
+"""
+
+CODE_BLOCK = re.compile(r"```(?:[\w+-]*\n)?([\s\S]*?)```")
+INLINE_CODE = re.compile(r"`([^`\n]+)`")
+LINKS = re.compile(r"\[([^\]\n]+)\]\((https?://[^\s)]+)\)|(https?://[^\s<]+)")
+PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+FORMATTING = [
+    (re.compile(r"\*\*(.+?)\*\*", re.S), r"<strong>\1</strong>"),
+    (re.compile(r"__(.+?)__", re.S), r"<u>\1</u>"),
+    (re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])", re.S), r"<em>\1</em>"),
+    (re.compile(r"(?<!\w)_(?!\s)(.+?)(?<!\s)_(?!\w)", re.S), r"<em>\1</em>"),
+    (re.compile(r"~~(.+?)~~", re.S), r"<s>\1</s>"),
+]
+
+# Everything a transcript needs is copied into plain dicts on the event loop, they're cheap to
+# build and can be pickled over to a worker process for the slow part, rendering the HTML.
+
+def author_data(author: discord.abc.User) -> dict:
+    return {
+        "id": author.id,
+        "name": author.display_name,
+        "avatar": author.display_avatar.url,
+        "bot": author.bot,
+    }
+
+def message_data(message: discord.Message) -> dict:
+    return {
+        "id": message.id,
+        "author": author_data(message.author),
+        "content": message.clean_content,
+        "created_at": message.created_at.timestamp(),
+        "edited_at": message.edited_at.timestamp() if message.edited_at else None,
+        "reference": message.reference.message_id if message.reference else None,
+        "mentions": [user.id for user in message.mentions],
+        "attachments": [
+            {"filename": attachment.filename, "url": attachment.url, "size": attachment.size, "content_type": attachment.content_type}
+            for attachment in message.attachments
+        ],
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+
+async def history_messages(channel: discord.TextChannel):
+    async for message in channel.history(limit=None, oldest_first=True):
+        yield message_data(message)
+
+def format_emphasis(text: str) -> str:
+    for pattern, replacement in FORMATTING:
+        text = pattern.sub(replacement, text)
+
+    return text
+
+def format_inline(text: str) -> str:
+    text = html.escape(text)
+    links = []
+
+    # Links are swapped for placeholders before any emphasis is applied, so an _ or * inside a URL
+    # can't cut it short.
+    def link(match: re.Match) -> str:
+        label, url, bare = match.groups()
+        links.append(f'<a href="{url or bare}">{format_emphasis(label) if label else bare}</a>')
+        return f"\x00{len(links) - 1}\x00"
+
+    text = format_emphasis(LINKS.sub(link, text))
+    text = PLACEHOLDER.sub(lambda match: links[int(match.group(1))], text)
+    return text.replace("\n", "<br>")
+
+def format_content(text: str) -> str:
+    parts = []
+    position = 0
+
+    for match in CODE_BLOCK.finditer(text):
+        parts.append(format_text(text[position:match.start()]))
+        code = match.group(1).strip("\n")
+        parts.append(f"<pre>{html.escape(code)}</pre>")
+        position = match.end()
+
+    parts.append(format_text(text[position:]))
+    return "".join(parts)
+
+def format_text(text: str) -> str:
+    parts = []
+    position = 0
+
+    for match in INLINE_CODE.finditer(text):
+        parts.append(format_inline(text[position:match.start()]))
+        parts.append(f"<code>{html.escape(match.group(1))}</code>")
+        position = match.end()
+
+    parts.append(format_inline(text[position:]))
+    return "".join(parts)
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def format_time(timestamp: float, zone) -> str:
+    return datetime.fromtimestamp(timestamp, zone).strftime("%b %d, %Y %I:%M %p")
+
+def get_zone(name: str):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+def render_attachment(attachment: dict) -> str:
+    url = html.escape(attachment["url"])
+    filename = html.escape(attachment["filename"])
+
+    if (attachment.get("content_type") or "").startswith("image/"):
+        return f'<div class="attachment"><a href="{url}"><img src="{url}" alt="{filename}" loading="lazy"></a></div>'
+
+    return f'<div class="attachment"><a class="file" href="{url}">📎 {filename} ({format_size(attachment["size"])})</a></div>'
+
+def render_embed(embed: dict) -> str:
+    color = f"#{embed['color']:06x}" if embed.get("color") is not None else "#1e1f22"
+    parts = [f'<div class="embed" style="border-left-color: {color}">']
+
+    if embed.get("author", {}).get("name"):
+        parts.append(f'<div class="embed-author">{html.escape(embed["author"]["name"])}</div>')
+
+    if embed.get("title"):
+        title = format_inline(embed["title"])
+        if embed.get("url"):
+            title = f'<a href="{html.escape(embed["url"])}">{title}</a>'
+
+        parts.append(f'<div class="embed-title">{title}</div>')
+
+    if embed.get("description"):
+        parts.append(f'<div class="embed-description">{format_content(embed["description"])}</div>')
+
+    if embed.get("fields"):
+        parts.append('<div class="embed-fields">')
+
+        for field in embed["fields"]:
+            parts.append(
+                f'<div class="embed-field{" inline" if field.get("inline") else ""}">'
+                f'<div class="embed-field-name">{format_inline(field.get("name", ""))}</div>'
+                f'<div>{format_content(field.get("value", ""))}</div></div>'
+            )
+
+        parts.append('</div>')
+
+    image = embed.get("image", {}).get("url") or embed.get("thumbnail", {}).get("url")
+    if image:
+        parts.append(f'<div class="embed-image"><img src="{html.escape(image)}" loading="lazy"></div>')
+
+    if embed.get("footer", {}).get("text"):
+        parts.append(f'<div class="embed-footer">{html.escape(embed["footer"]["text"])}</div>')
+
+    parts.append('</div>')
+    return "".join(parts)
+
+def render_body(message: dict) -> str:
+    parts = []
+
+    if message["content"]:
+        edited = '<span class="edited">(edited)</span>' if message["edited_at"] else ""
+        parts.append(f'<div class="content">{format_content(message["content"])}{edited}</div>')
+
+    parts.extend(render_attachment(attachment) for attachment in message["attachments"])
+    parts.extend(render_embed(embed) for embed in message["embeds"])
+
+    return "".join(parts)
+
+def render_messages(messages: list, zone_name: str = transcript_timezone, previous: dict = None) -> str:
+    # previous is the message before this batch, so a long ticket can be rendered in pieces and
+    # still group consecutive messages from the same author.
+    zone = get_zone(zone_name)
+    parts = []
+
+    for message in messages:
+        author = message["author"]
+        continued = (
+            previous is not None
+            and previous["author"]["id"] == author["id"]
+            and message["reference"] is None
+            and message["created_at"] - previous["created_at"] < 420
+        )
+
+        if continued:
+            parts.append(f'<div class="continued" id="m{message["id"]}">{render_body(message)}</div>')
+        else:
+            reply = f'<div class="reply">↪ <a href="#m{message["reference"]}">Replying to a message</a></div>' if message["reference"] else ""
+            tag = '<span class="tag">BOT</span>' if author["bot"] else ""
+
+            parts.append(
+                f'<div class="group" id="m{message["id"]}">'
+                f'<img class="avatar" src="{html.escape(author["avatar"])}" loading="lazy">'
+                f'<div class="body">{reply}<div><span class="author" title="{author["id"]}">{html.escape(author["name"])}</span>{tag}'
+                f'<span class="time">{format_time(message["created_at"], zone)}</span></div>'
+                f'{render_body(message)}</div></div>'
+            )
+
+        previous = message
+
+    return "\n".join(parts)
+
+def render_header(channel_name: str, guild_name: str) -> str:
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+        f'<title>{html.escape(channel_name)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n'
+        f'<header><h1>#{html.escape(channel_name)}</h1><p>{html.escape(guild_name)}</p></header>\n<main>\n'
+    )
+
+def render_footer(count: int, zone_name: str = transcript_timezone) -> str:
+    exported = format_time(time.time(), get_zone(zone_name))
+    return f'\n</main>\n<footer>Exported {count:,} message{"" if count == 1 else "s"} on {exported}</footer>\n</body>\n</html>\n'
+
+def render_chunk(messages: list, zone_name: str, previous: dict = None) -> bytes:
+    return (render_messages(messages, zone_name, previous) + "\n").encode()
+
+class TranscriptReader(io.RawIOBase):
+    # A read position of its own over the shared buffer, so the archive post and the DM can
+    # upload the same transcript at the same time without copying it.
+    def __init__(self, transcript):
+        self.transcript = transcript
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.transcript.size
+
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, target) -> int:
+        # aiohttp reads uploads from executor threads, the seek and read have to happen together.
+        with self.transcript.lock:
+            self.transcript.buffer.seek(self.position)
+            chunk = self.transcript.buffer.read(len(target))
+
+        target[:len(chunk)] = chunk
+        self.position += len(chunk)
+
+        return len(chunk)
+
+class TranscriptFile:
+    def __init__(self, buffer, filename: str, count: int):
+        self.buffer = buffer
+        self.filename = filename
+        self.count = count
+        self.lock = threading.Lock()
+
+        self.buffer.seek(0, io.SEEK_END)
+        self.size = self.buffer.tell()
+
+    def file(self) -> discord.File:
+        # Every upload reads the same buffer through its own reader, the transcript is never copied.
+        return discord.File(TranscriptReader(self), filename=self.filename)
+
+    def close(self):
+        self.buffer.close()
+
+class TranscriptRenderer:
+    def __init__(self, workers: int, queue: int):
+        self.workers = workers
+        self._executor = None
+        # Bounds how many chunks are handed to the pool at once, closing a burst of tickets waits
+        # here instead of piling every message list into the pool's queue.
+        self._semaphore = asyncio.Semaphore(queue)
+
+        self.exports = 0
+        self.messages = 0
+        self.jobs = 0
+        self.failed = 0
+        self.wait_time = 0.0
+        self.render_time = 0.0
+        self.max_render_time = 0.0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that already runs the database and HTTP threads can leave a worker
+            # holding a lock nobody will release, so workers start from a clean interpreter instead.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, function, *args):
+        queued = time.perf_counter()
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            self.wait_time += started - queued
+
+            executor = self.executor
+
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+            except BrokenProcessPool:
+                # A worker died and took the pool with it, the next job starts a fresh one instead of
+                # failing on the broken pool until the bot restarts.
+                self.failed += 1
+                if self._executor is executor:
+                    executor.shutdown(wait=False)
+                    self._executor = None
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.jobs += 1
+                self.render_time += elapsed
+                self.max_render_time = max(self.max_render_time, elapsed)
+
+    async def export(self, channel: discord.TextChannel, messages=None) -> TranscriptFile:
+        # messages is read a chunk at a time and each chunk is rendered while the next one is
+        # fetched, so only two chunks are ever held in memory however long the ticket ran. The
+        # output is spooled to disk once it outgrows transcript_spool_size.
+        buffer = tempfile.SpooledTemporaryFile(max_size=transcript_spool_size)
+        output = gzip.GzipFile(filename=f"{channel.name}.html", fileobj=buffer, mode="wb") if transcript_compress else buffer
+
+        pending = None
+        previous = None
+        chunk = []
+        count = 0
+
+        async def write(job):
+            await asyncio.to_thread(output.write, await job)
+
+        try:
+            await asyncio.to_thread(output.write, render_header(channel.name, channel.guild.name).encode())
+
+            async for message in messages or history_messages(channel):
+                chunk.append(message)
+
+                if len(chunk) >= transcript_chunk:
+                    if pending:
+                        await write(pending)
+
+                    pending = asyncio.ensure_future(self.run(render_chunk, chunk, transcript_timezone, previous))
+                    previous = chunk[-1]
+                    count += len(chunk)
+                    chunk = []
+
+            if pending:
+                await write(pending)
+                pending = None
+
+            if chunk:
+                count += len(chunk)
+                await write(self.run(render_chunk, chunk, transcript_timezone, previous))
+
+            await asyncio.to_thread(output.write, render_footer(count, transcript_timezone).encode())
+
+            if output is not buffer:
+                output.close()
+        except BaseException:
+            if pending:
+                pending.cancel()
+
+            buffer.close()
+            raise
+
+        self.exports += 1
+        self.messages += count
+
+        return TranscriptFile(buffer, f"{channel.name}.html.gz" if transcript_compress else f"{channel.name}.html", count)
+
+transcripts = TranscriptRenderer(transcript_workers, transcript_queue)
\ No newline at end of file
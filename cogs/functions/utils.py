@@ -1,11 +1,15 @@
 import discord
-import paypalrestsdk
-import chat_exporter
-import aiosqlite
+import aiohttp
+import asyncio
+import hashlib
 import yaml
-import io
-from paypalrestsdk import Invoice
+import time
 from datetime import datetime
+from typing import Optional
+from cogs.functions.paypal import PayPalError, paypal
+from cogs.functions.repository import close_commission, get_ticket, get_ticket_messages
+from cogs.functions.transcript import message_data, transcripts
+from cogs.functions.recorder import recorder, stored_messages
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -16,7 +20,10 @@ website = data["Invoice"]["WEBSITE"]
 logo_url = data["Invoice"]["LOGO_URL"]
 fee = data["Invoice"]["FEE"]
 
-async def create_invoice(auth: paypalrestsdk.Api, total: int, department: str, freelancer: discord.Member, channel: discord.TextChannel, email: str = None):
+# Step name -> (times run, total seconds, slowest seconds) for the side effects of closing a ticket.
+close_step_times = {}
+
+async def create_invoice(total: int, department: str, freelancer: discord.Member, channel: discord.TextChannel, email: str = None, request_id: str = None):
     invoice_data = {
         "merchant_info": {
             "business_name": name,
@@ -56,91 +63,151 @@ async def create_invoice(auth: paypalrestsdk.Api, total: int, department: str, f
     if email:
         invoice_data["billing_info"] = [{"email": email}]
 
-    invoice = Invoice(invoice_data, api=auth)
+    # Only creates the draft, the caller sends it in the background so /invoice answers after a
+    # single PayPal round-trip.
+    try:
+        invoice = await paypal.create_invoice(invoice_data, request_id)
+    except (PayPalError, aiohttp.ClientError, asyncio.TimeoutError):
+        return False
+
+    return invoice["id"]
+
+def invoice_request_id(channel_id: int, amount: int, existing: int) -> str:
+    # The same channel, amount and number of earlier invoices always gives the same key, so a
+    # retried or double-clicked /invoice is recognised by PayPal instead of billing twice.
+    digest = hashlib.sha256(f"{channel_id}:{amount}:{existing}".encode()).hexdigest()
+    return f"invoice-{digest[:32]}"
+
+async def timed_step(name: str, step) -> float:
+    started = time.perf_counter()
+
+    try:
+        await step
+    finally:
+        elapsed = time.perf_counter() - started
+        count, total, slowest = close_step_times.get(name, (0, 0.0, 0.0))
+        close_step_times[name] = (count + 1, total + elapsed, max(slowest, elapsed))
+
+    return elapsed
 
-    if invoice.create():
-        invoice = Invoice.find(invoice['id'], api=auth)
+async def run_close_steps(channel_name: str, steps: dict) -> set:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(timed_step(name, step) for name, step in steps.items()), return_exceptions=True)
+    failed = set()
 
-        if invoice.send():
-            return invoice.id
-        else:
-            return False
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            failed.add(name)
+            print(f'Failed to {name.replace("_", " ")} while closing {channel_name}: {result}')
+
+    timings = ", ".join(f"{name} {'failed' if name in failed else f'{result * 1000:.0f}ms'}" for name, result in zip(steps, results))
+    print(f'Ran close steps for {channel_name} in {(time.perf_counter() - started) * 1000:.0f}ms ({timings})')
+
+    return failed
+
+async def get_ticket_creator(client: discord.Client, guild: discord.Guild, creator_id: int):
+    if not creator_id:
+        return None
+
+    try:
+        return guild.get_member(creator_id) or await client.fetch_user(creator_id)
+    except discord.HTTPException:
+        return None
 
 async def close_ticket(interaction: discord.Interaction):
-    first_message = [msg async for msg in interaction.channel.history(oldest_first=True, limit=1)]
-    
-    if not first_message or not first_message[0].mentions:
-        await interaction.followup.send("❌ Could not determine the ticket creator.", ephemeral=True)
-        return
+    error = await close_ticket_channel(interaction.client, interaction.channel)
+
+    if error:
+        await interaction.followup.send(error, ephemeral=True)
+
+async def close_ticket_channel(client: discord.Client, channel: discord.TextChannel) -> Optional[str]:
+    # Needs nothing from an interaction, so tickets can also be closed for inactivity. Returns why the
+    # ticket was left open, or None once it's closed.
+
+    # Ticket messages are captured as they're posted, so closing reads them back locally instead of
+    # walking the channel's history. Until a ticket's capture is known to be complete (it's still
+    # being caught up after a restart, or catching up failed) it falls back to Discord.
+    await recorder.flush()
+    stored = await get_ticket_messages(channel.id, limit=1)
+    messages = stored_messages(channel.id) if stored and recorder.is_complete(channel.id) else None
+
+    ticket = await get_ticket(channel.id)
+
+    if ticket:
+        creator_id = ticket.creator_id
+    else:
+        # Opened before tickets were recorded, the creator is the member mentioned in the first message.
+        if not stored:
+            stored = [message_data(msg) async for msg in channel.history(oldest_first=True, limit=1)]
+
+        creator_id = stored[0]["mentions"][0] if stored and stored[0]["mentions"] else None
+
+    creator = await get_ticket_creator(client, channel.guild, creator_id)
+
+    if not creator:
+        return "❌ Could not determine the ticket creator."
 
-    creator = first_message[0].mentions[0]
     timestamp = int(datetime.now().timestamp())
 
-    transcript = await chat_exporter.export(
-        interaction.channel,
-        limit=500,
-        tz_info="MST",
-        military_time=False,
-        fancy_times=True,
-        bot=interaction.client,
-    )
+    # Only fetching the messages happens on the event loop, the HTML is built in a worker process
+    # so a long ticket doesn't hold up every other interaction while it renders.
+    try:
+        transcript = await transcripts.export(channel, messages)
+    except Exception as error:
+        print(f'Failed to render the transcript for {channel.name}: {error}')
+        transcript = None
 
     if transcript is None:
-        await interaction.followup.send("❌ Failed to create transcript.", ephemeral=True)
-        return
-
-    file_bytes = io.BytesIO(transcript.encode())
-    file_name = f"{interaction.channel.name}.html"
+        return "❌ Failed to create transcript."
 
     archive_channel_id = data["Tickets"].get("ARCHIVE_CHANNEL_ID")
-    archive_channel = interaction.guild.get_channel(archive_channel_id) if archive_channel_id else None
+    archive_channel = channel.guild.get_channel(archive_channel_id) if archive_channel_id else None
 
-    embed = discord.Embed(title="📜 Ticket Transcript 📜", description=f"Creator: {creator.mention}\nClosed At: <t:{timestamp}:f>\nChannel: {interaction.channel.name}", color=discord.Color.from_str(embed_color))
+    embed = discord.Embed(title="📜 Ticket Transcript 📜", description=f"Creator: {creator.mention}\nClosed At: <t:{timestamp}:f>\nChannel: {channel.name}\nMessages: {transcript.count}", color=discord.Color.from_str(embed_color))
     embed.set_footer(text="Download the file above and open it to view the transcript")
     embed.timestamp = datetime.now()
 
-    if archive_channel:
-        archive_file = discord.File(io.BytesIO(transcript.encode()), filename=file_name)
-        await archive_channel.send(embed=embed, file=archive_file)
-
+    async def archive():
+        if archive_channel:
+            await archive_channel.send(embed=embed, file=transcript.file())
+
+    async def notify_creator():
+        try:
+            await creator.send(embed=embed, file=transcript.file())
+        except discord.Forbidden:
+            pass
+
+    async def delete_board_message():
+        freelancer_channel = channel.guild.get_channel(commission_data.freelancer_channel_id)
+        if freelancer_channel:
+            await freelancer_channel.get_partial_message(commission_data.freelancer_message_id).delete()
+
+    async def notify_freelancer():
+        freelancer = channel.guild.get_member(commission_data.freelancer_id)
+        if freelancer:
+            embed = discord.Embed(title="Payment Received", description=f"You have just received `${commission_data.amount:.2f}` to your balance. This payment is coming from the `{channel.name}` ticket. To withdraw this money, use the `/wallet` command. \n\n**Total Available For Withdrawal**\n`${balance:.2f}`", color=discord.Color.from_str(embed_color))
+            await freelancer.send(embed=embed)
+
+    # The transcript uploads don't depend on each other, so they share one round-trip of waiting
+    # instead of queueing up behind each other. A failing step is logged without stopping the rest.
     try:
-        file_bytes.seek(0)
-        user_file = discord.File(file_bytes, filename=file_name)
-        await creator.send(embed=embed, file=user_file)
-    except discord.Forbidden:
-        pass
-
-    async with aiosqlite.connect("database.db") as db:
-        cursor = await db.execute("SELECT * FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-        commission_data = await cursor.fetchone()
-
-        if commission_data:
-            try:
-                freelancer_channel = interaction.guild.get_channel(commission_data[2])
-                freelancer_message = await freelancer_channel.fetch_message(commission_data[3])
-                await freelancer_message.delete()
-            except:
-                pass
-
-            if commission_data[5] and commission_data[6] >= 0:
-                cursor = await db.execute("SELECT * FROM wallets WHERE member_id = ?", (commission_data[5],))
-                wallet_data = await cursor.fetchone()
-
-                if wallet_data:
-                    await db.execute('UPDATE wallets SET amount = amount + ? WHERE member_id = ?', (commission_data[6], commission_data[5]))
-                
-                try:
-                    freelancer = interaction.guild.get_member(commission_data[5])
-                    embed = discord.Embed(title="Payment Received", description=f"You have just received `${commission_data[6]:.2f}` to your balance. This payment is coming from the `{interaction.channel.name}` ticket. To withdraw this money, use the `/wallet` command. \n\n**Total Available For Withdrawal**\n`${wallet_data[3] + commission_data[6]:.2f}`", color=discord.Color.from_str(embed_color))
-                    await freelancer.send(embed=embed)
-                except:
-                    pass
-        
-        await db.execute("DELETE FROM commissions WHERE channel_id = ?", (interaction.channel.id,))
-        await db.execute("DELETE FROM questions WHERE channel_id = ?", (interaction.channel.id,))
-        await db.execute("DELETE FROM quotes WHERE channel_id = ?", (interaction.channel.id,))
-        await db.execute("DELETE FROM invoices WHERE channel_id = ?", (interaction.channel.id,))
-
-        await db.commit()
-    
-    await interaction.channel.delete()
\ No newline at end of file
+        failed = await run_close_steps(channel.name, {"archive": archive(), "creator_dm": notify_creator()})
+    finally:
+        transcript.close()
+
+    # Nothing is cleared until the transcript is safely archived, so a failed close can be retried.
+    if "archive" in failed:
+        return "❌ The transcript could not be archived, so this channel was left open. Please try closing it again."
+
+    commission_data, balance = await close_commission(channel.id)
+
+    steps = {}
+    if commission_data:
+        steps["board_message"] = delete_board_message()
+    if balance is not None:
+        steps["freelancer_dm"] = notify_freelancer()
+
+    if steps:
+        await run_close_steps(channel.name, steps)
+
+    await channel.delete()
\ No newline at end of file
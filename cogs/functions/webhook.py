@@ -0,0 +1,79 @@
+import aiohttp
+import asyncio
+import json
+import yaml
+from aiohttp import web
+from cogs.functions.paypal import PayPalError, paypal
+
+with open('config.yml', 'r') as file:
+    data = yaml.safe_load(file)
+
+webhook_config = data["Invoice"].get("WEBHOOK", {})
+webhook_enabled = webhook_config.get("ENABLED", False)
+webhook_host = webhook_config.get("HOST", "0.0.0.0")
+webhook_port = webhook_config.get("PORT", 8080)
+webhook_path = webhook_config.get("PATH", "/paypal/webhook")
+webhook_id = webhook_config.get("WEBHOOK_ID", "")
+webhook_verify = webhook_config.get("VERIFY", True)
+
+class WebhookServer:
+    def __init__(self, handler):
+        # handler(event) is awaited for every verified event, raising makes PayPal redeliver it.
+        self.handler = handler
+        self.runner = None
+
+        self.received = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def start(self):
+        app = web.Application(client_max_size=1024 * 1024)
+        app.router.add_post(webhook_path, self.receive)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, webhook_host, webhook_port).start()
+
+        print(f'Listening for PayPal webhooks on {webhook_host}:{webhook_port}{webhook_path}')
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def receive(self, request: web.Request) -> web.Response:
+        try:
+            event = json.loads(await request.read())
+        except ValueError:
+            return web.Response(status=400)
+
+        if webhook_verify:
+            try:
+                verified = await paypal.verify_webhook_signature(request.headers, webhook_id, event)
+            except PayPalError as error:
+                # Only an outage is worth PayPal delivering the event again. A wrong WEBHOOK_ID or bad
+                # credentials would fail the same way forever, so they're logged and rejected.
+                if error.transient:
+                    return web.Response(status=503)
+
+                self.rejected += 1
+                print(f'Failed to verify PayPal webhook {event.get("id")}, check WEBHOOK_ID and the PayPal credentials: {error}')
+                return web.Response(status=400)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # PayPal couldn't be asked, a non-2xx reply makes it deliver the event again later.
+                return web.Response(status=503)
+
+            if not verified:
+                self.rejected += 1
+                return web.Response(status=401)
+
+        self.received += 1
+
+        try:
+            await self.handler(event)
+        except Exception as error:
+            self.failed += 1
+            print(f'Failed to handle PayPal webhook {event.get("id")}: {error}')
+            return web.Response(status=500)
+
+        return web.Response(status=200)
\ No newline at end of file
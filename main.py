@@ -4,6 +4,11 @@ import sys
 from discord.ext.commands import CommandNotFound
 from discord.ext import commands
 from cogs.functions.sqlite import check_tables
+from cogs.functions.database import database
+from cogs.functions.paypal import paypal
+from cogs.functions.transcript import transcripts
+from cogs.functions.recorder import recorder
+from cogs.functions.timers import ticket_timers
 
 with open('config.yml', 'r') as file:
     data = yaml.safe_load(file)
@@ -102,7 +107,10 @@ initial_extensions = [
     'cogs.commands.tickets',
     'cogs.commands.vouch',
     'cogs.commands.wallet',
+    'cogs.events.inactivity',
     'cogs.events.member',
+    'cogs.events.messages',
+    'cogs.functions.maintenance',
     'cogs.functions.sqlite'
 ]
 
@@ -120,13 +128,24 @@ class UpsetBot(commands.Bot):
         print('Succesfully synced slash commands!')
 
     async def setup_hook(self):
+        print('Opening database connections...')
+        await database.start()
+
         print('Checking local databases...')
-        await check_tables()
-        print('Check successful!')
+        elapsed = await check_tables()
+        print(f'Check successful! ({elapsed * 1000:.0f}ms)')
         
         for extension in initial_extensions:
             await self.load_extension(extension)
 
+    async def close(self):
+        await super().close()
+        await paypal.close()
+        transcripts.close()
+        await recorder.flush()
+        await ticket_timers.flush()
+        await database.close()
+
 client = UpsetBot()
 client.remove_command('help')
 
@@ -136,4 +155,6 @@ async def on_command_error(ctx, error):
         return
     raise error
 
-client.run(token)
\ No newline at end of file
+# Transcript workers import this file again on platforms that spawn processes instead of forking.
+if __name__ == "__main__":
+    client.run(token)
\ No newline at end of file
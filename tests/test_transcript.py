@@ -0,0 +1,27 @@
+import shutil
+import tempfile
+import sys
+import os
+
+# The cogs read config.yml from the working directory when they're imported.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+folder = tempfile.mkdtemp()
+shutil.copy(os.path.join(ROOT, "example_config.yml"), os.path.join(folder, "config.yml"))
+os.chdir(folder)
+sys.path.insert(0, ROOT)
+
+from cogs.functions.transcript import format_content
+
+def test_url_with_underscores_is_not_emphasised():
+    url = "https://x.com/_a_/"
+    assert format_content(url) == f'<a href="{url}">{url}</a>'
+
+def test_url_with_asterisks_is_not_emphasised():
+    url = "https://x.com/*b*/c"
+    assert format_content(f"see {url} and *this*") == f'see <a href="{url}">{url}</a> and <em>this</em>'
+
+def test_masked_link_keeps_its_url_and_formats_its_label():
+    assert format_content("[**docs**](https://x.com/a_b_c_)") == '<a href="https://x.com/a_b_c_"><strong>docs</strong></a>'
+
+def test_code_spans_are_left_alone():
+    assert format_content("`_a_` _b_") == "<code>_a_</code> <em>b</em>"
\ No newline at end of file
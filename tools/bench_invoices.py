@@ -0,0 +1,304 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import tempfile
+import time
+import yaml
+import os
+from types import SimpleNamespace
+from aiohttp import web
+from fake_paypal import FakePayPal
+
+# Measures the invoice subsystem against tools/fake_paypal.py: seeds thousands of open invoices,
+# drives the poller (or reconciliation) the way the bot does and reports cycle times, how long
+# the event loop was blocked and how many PayPal calls every paid invoice cost. Runs in a
+# temporary folder with its own config.yml and database, the real ones are never touched.
+#
+#   python tools/bench_invoices.py --invoices 5000 --duration 120
+#   python tools/bench_invoices.py --mode reconcile --latency 0.2 --error-rate 0.05 --output before.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+def summary(values: list) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_config(args, folder: str, port: int):
+    with open(os.path.join(ROOT, "example_config.yml"), "r") as file:
+        config = yaml.safe_load(file)
+
+    config.setdefault("Commissions", [])
+    config["Database"].update({"PATH": os.path.join(folder, "bench.db"), "BACKUP_INTERVAL": 0})
+
+    invoice = config["Invoice"]
+    invoice.setdefault("LOGO_URL", "")
+    invoice.update({"PAYPAL_CLIENT_ID": "bench", "PAYPAL_CLIENT_SECRET": "bench", "PAYPAL_BASE_URL": f"http://127.0.0.1:{port}"})
+    invoice["RECONCILE"].update({"ENABLED": args.mode == "reconcile", "INTERVAL": args.reconcile_interval, "PAGE_SIZE": args.page_size})
+    invoice["WEBHOOK"]["ENABLED"] = False
+
+    if args.poll_batch:
+        invoice["POLL_BATCH"] = args.poll_batch
+
+    with open(os.path.join(folder, "config.yml"), "w") as file:
+        yaml.safe_dump(config, file)
+
+class FakeMessage:
+    jump_url = "https://discord.com/channels/0/0/0"
+
+class FakeChannel:
+    def __init__(self, bench, channel_id: int):
+        self.bench = bench
+        self.id = channel_id
+        self.name = f"ticket-{channel_id}"
+
+    def get_partial_message(self, message_id: int):
+        return SimpleNamespace(edit=self.edit)
+
+    async def edit(self, **kwargs):
+        self.bench.discord_calls += 1
+        await asyncio.sleep(self.bench.discord_latency)
+        return FakeMessage()
+
+    async def send(self, **kwargs):
+        self.bench.discord_calls += 1
+        await asyncio.sleep(self.bench.discord_latency)
+        return FakeMessage()
+
+class FakeBot:
+    # Just enough of commands.Bot for InvoiceCog to check and announce invoices.
+    def __init__(self, discord_latency: float):
+        self.discord_latency = discord_latency
+        self.discord_calls = 0
+        self.channels = {}
+
+    def get_channel(self, channel_id: int):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(self, channel_id)
+
+        return self.channels[channel_id]
+
+async def monitor_loop(lags: list, interval: float = 0.01):
+    # A sleep that wakes up late means something held the event loop for that long.
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started - interval))
+
+async def seed(fake: FakePayPal, count: int, max_age: float) -> float:
+    from cogs.functions.database import database
+    from cogs.functions.poller import next_interval
+    from cogs.functions.repository import Invoice, columns
+    from dataclasses import astuple, fields
+
+    started = time.perf_counter()
+    now = time.time()
+    rows = []
+
+    for index in range(count):
+        created_at = now - random.uniform(0, max_age)
+        remote = fake.add_invoice("SENT", created_at=created_at)
+        rows.append(Invoice(1000 + index, 10 ** 6 + index, remote["id"], random.randint(5, 500), int(created_at), created_at + next_interval(0), 0, "sent", 0, None))
+
+    sql = f"INSERT INTO invoices ({columns(Invoice)}) VALUES ({', '.join('?' * len(fields(Invoice)))})"
+    for offset in range(0, len(rows), 500):
+        await database.batch([(sql, astuple(invoice)) for invoice in rows[offset:offset + 500]])
+
+    return time.perf_counter() - started
+
+async def create_invoices(cog, count: int) -> list:
+    from cogs.functions.poller import next_interval
+    from cogs.functions.repository import add_invoice
+    from cogs.functions.utils import create_invoice, invoice_request_id
+
+    freelancer = SimpleNamespace(name="bench")
+    timings = []
+
+    async def create(index: int):
+        channel = cog.bot.get_channel(10 ** 7 + index)
+        started = time.perf_counter()
+
+        # The same steps /invoice takes, minus the Discord reply.
+        invoice_id = await create_invoice(50, "Bench", freelancer, channel, None, invoice_request_id(channel.id, 50, 0))
+        if not invoice_id:
+            return
+
+        invoice = await add_invoice(channel.id, 10 ** 7 + index, invoice_id, 50, time.time() + next_interval(0), state="created")
+        cog.poller.add(invoice)
+        timings.append(time.perf_counter() - started)
+
+        await cog.send_invoice(invoice)
+
+    await asyncio.gather(*(create(index) for index in range(count)))
+    return timings
+
+async def run(args, port: int) -> dict:
+    from cogs.commands.invoice import InvoiceCog, poll_tick
+    from cogs.functions.database import database
+    from cogs.functions.paypal import paypal
+    from cogs.functions.sqlite import check_tables
+
+    fake = FakePayPal(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.pay_after, args.pay_probability)
+    runner = web.AppRunner(fake.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    await database.start()
+    await check_tables()
+
+    seed_time = await seed(fake, args.invoices, args.max_age)
+    bot = FakeBot(args.discord_latency)
+    cog = InvoiceCog(bot)
+
+    lags = []
+    monitor = asyncio.create_task(monitor_loop(lags))
+
+    load_started = time.perf_counter()
+    await cog.poller.load()
+    load_time = time.perf_counter() - load_started
+
+    create_times = await create_invoices(cog, args.creates)
+
+    interval = poll_tick if args.mode == "poll" else args.reconcile_interval
+    cycles = []
+    started = time.perf_counter()
+    next_report = started + 10
+
+    while time.perf_counter() - started < args.duration:
+        cycle_started = time.perf_counter()
+
+        try:
+            if args.mode == "poll":
+                await cog.poller.tick()
+            else:
+                await cog.poller.reconcile()
+        except Exception as error:
+            print(f"Cycle failed: {error}")
+
+        cycle_time = time.perf_counter() - cycle_started
+        cycles.append(cycle_time)
+
+        if time.perf_counter() >= next_report:
+            print(f"{time.perf_counter() - started:6.0f}s  open {len(cog.poller):,}  checks {cog.poller.checks:,}  paid {cog.poller.finished:,}  paypal calls {paypal.requests:,}")
+            next_report += 10
+
+        await asyncio.sleep(max(0, interval - cycle_time))
+
+    elapsed = time.perf_counter() - started
+    monitor.cancel()
+
+    async with database.connection() as db:
+        cursor = await db.execute("SELECT state, COUNT(*) FROM invoices GROUP BY state")
+        states = dict(await cursor.fetchall())
+
+    await paypal.close()
+    await database.close()
+    await runner.cleanup()
+
+    paid = states.get("paid", 0)
+
+    return {
+        "mode": args.mode,
+        "invoices": args.invoices,
+        "duration": elapsed,
+        "seed_time": seed_time,
+        "load_time": load_time,
+        "cycle_time": summary(cycles),
+        "loop_lag": summary(lags),
+        "create_time": summary(create_times),
+        "states": states,
+        "paypal_requests": paypal.requests,
+        "paypal_retries": paypal.retries,
+        "paypal_calls": dict(fake.calls),
+        "injected_errors": {str(status): count for status, count in fake.errors.items()},
+        "calls_per_paid_invoice": paypal.requests / paid if paid else None,
+        "discord_calls": bot.discord_calls,
+        "database_commits": database.commits,
+        "database_writes": database.writes,
+    }
+
+def report(result: dict):
+    def line(name: str, stats: dict):
+        print(f"{name:<16} n={stats['count']:<7,} mean {stats['mean'] * 1000:8.1f}ms  p50 {stats['p50'] * 1000:8.1f}ms  p95 {stats['p95'] * 1000:8.1f}ms  p99 {stats['p99'] * 1000:8.1f}ms  max {stats['max'] * 1000:8.1f}ms")
+
+    print()
+    print(f"Mode: {result['mode']}, {result['invoices']:,} invoices over {result['duration']:.0f}s")
+    print(f"Seeded in {result['seed_time']:.2f}s, poller loaded in {result['load_time'] * 1000:.1f}ms")
+    line("Cycle time", result["cycle_time"])
+    line("Event loop lag", result["loop_lag"])
+    line("Invoice create", result["create_time"])
+    print(f"Invoice states:  {', '.join(f'{state} {count:,}' for state, count in sorted(result['states'].items()))}")
+    print(f"PayPal calls:    {result['paypal_requests']:,} ({result['paypal_retries']:,} retries, injected errors {result['injected_errors'] or 'none'})")
+
+    for endpoint, count in sorted(result["paypal_calls"].items()):
+        print(f"    {endpoint:<48} {count:,}")
+
+    per_paid = result["calls_per_paid_invoice"]
+    print(f"Calls per paid:  {per_paid:.2f}" if per_paid is not None else "Calls per paid:  no invoices were paid")
+    print(f"Discord calls:   {result['discord_calls']:,}")
+    print(f"Database:        {result['database_writes']:,} writes in {result['database_commits']:,} commits")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks invoice polling against a fake PayPal API.")
+    parser.add_argument("--mode", choices=["poll", "reconcile"], default="poll")
+    parser.add_argument("--invoices", type=int, default=2000, help="Open invoices to seed")
+    parser.add_argument("--max-age", type=float, default=86400, help="Oldest seeded invoice in seconds")
+    parser.add_argument("--creates", type=int, default=20, help="Invoices created through create_invoice before polling starts")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run the loop for")
+    parser.add_argument("--poll-batch", type=int, default=None, help="Overrides POLL_BATCH")
+    parser.add_argument("--reconcile-interval", type=float, default=10)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--pay-after", type=float, default=30)
+    parser.add_argument("--pay-probability", type=float, default=0.5)
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable runs")
+    parser.add_argument("--output", default=None, help="Also writes the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    output = os.path.abspath(args.output) if args.output else None
+    port = free_port()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # The cogs read config.yml from the working directory when they're imported.
+        write_config(args, folder, port)
+        os.chdir(folder)
+        sys.path.insert(0, ROOT)
+
+        result = asyncio.run(run(args, port))
+        os.chdir(ROOT)
+
+    report(result)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(result, file, indent=4)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+from aiohttp import web
+
+# A local stand-in for the parts of the PayPal REST API the bot uses: OAuth, the v1 invoicing
+# endpoints and webhook verification. Point PAYPAL_BASE_URL at it to run the bot or the
+# benchmark without touching live PayPal.
+#
+#   python tools/fake_paypal.py --port 8081 --latency 0.2 --error-rate 0.05 --pay-after 30
+
+class FakePayPal:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0, rate_limit_rate: float = 0.0, pay_after: float = 60, pay_probability: float = 0.5):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.pay_after = pay_after
+        self.pay_probability = pay_probability
+
+        self.invoices = {}
+        self.request_ids = {}
+        self.calls = Counter()
+        self.errors = Counter()
+
+    @property
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes([
+            web.post("/v1/oauth2/token", self.token),
+            web.post("/v1/invoicing/invoices", self.create),
+            web.get("/v1/invoicing/invoices/{id}", self.find),
+            web.post("/v1/invoicing/invoices/{id}/send", self.send),
+            web.post("/v1/invoicing/search", self.search),
+            web.post("/v1/notifications/verify-webhook-signature", self.verify),
+            web.post("/fake/invoices/{id}/pay", self.force_pay),
+            web.get("/fake/stats", self.stats),
+        ])
+
+        return app
+
+    def add_invoice(self, status: str = "SENT", created_at: float = None) -> dict:
+        invoice_id = f"INV2-{uuid.uuid4().hex[:4].upper()}-{uuid.uuid4().hex[:4].upper()}-{uuid.uuid4().hex[:4].upper()}-{uuid.uuid4().hex[:4].upper()}"
+        created_at = created_at or time.time()
+
+        invoice = {"id": invoice_id, "status": status, "created_at": created_at, "paid_at": None}
+        if status == "SENT":
+            self.schedule_payment(invoice, created_at)
+
+        self.invoices[invoice_id] = invoice
+        return invoice
+
+    def schedule_payment(self, invoice: dict, sent_at: float):
+        # Some invoices are paid after a random wait, the rest are never paid.
+        if random.random() < self.pay_probability:
+            invoice["paid_at"] = sent_at + random.expovariate(1 / self.pay_after) if self.pay_after > 0 else sent_at
+
+    def status(self, invoice: dict) -> str:
+        if invoice["status"] == "SENT" and invoice["paid_at"] is not None and invoice["paid_at"] <= time.time():
+            invoice["status"] = "PAID"
+
+        return invoice["status"]
+
+    def render(self, invoice: dict) -> dict:
+        return {
+            "id": invoice["id"],
+            "status": self.status(invoice),
+            "invoice_date": time.strftime("%Y-%m-%d PST", time.localtime(invoice["created_at"])),
+        }
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        if request.path.startswith("/fake/"):
+            return await handler(request)
+
+        self.calls[f"{request.method} {request.match_info.route.resource.canonical if request.match_info.route.resource else request.path}"] += 1
+        await asyncio.sleep(max(0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.errors[429] += 1
+            return web.json_response({"name": "RATE_LIMIT_REACHED", "message": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors[503] += 1
+            return web.json_response({"name": "INTERNAL_SERVICE_ERROR", "message": "Fake outage"}, status=503)
+
+        return await handler(request)
+
+    async def token(self, request: web.Request) -> web.Response:
+        return web.json_response({"access_token": uuid.uuid4().hex, "token_type": "Bearer", "expires_in": 32400})
+
+    async def create(self, request: web.Request) -> web.Response:
+        request_id = request.headers.get("PayPal-Request-Id")
+
+        if request_id in self.request_ids:
+            return web.json_response(self.render(self.invoices[self.request_ids[request_id]]), status=201)
+
+        invoice = self.add_invoice(status="DRAFT")
+        if request_id:
+            self.request_ids[request_id] = invoice["id"]
+
+        return web.json_response(self.render(invoice), status=201)
+
+    async def find(self, request: web.Request) -> web.Response:
+        invoice = self.invoices.get(request.match_info["id"])
+
+        if not invoice:
+            return web.json_response({"name": "RESOURCE_NOT_FOUND", "message": "The requested resource does not exist."}, status=404)
+
+        return web.json_response(self.render(invoice))
+
+    async def send(self, request: web.Request) -> web.Response:
+        invoice = self.invoices.get(request.match_info["id"])
+
+        if not invoice:
+            return web.json_response({"name": "RESOURCE_NOT_FOUND", "message": "The requested resource does not exist."}, status=404)
+
+        if invoice["status"] == "DRAFT":
+            invoice["status"] = "SENT"
+            self.schedule_payment(invoice, time.time())
+
+        return web.Response(status=202)
+
+    async def search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        statuses = set(body.get("status") or [])
+        page = int(body.get("page", 0))
+        page_size = int(body.get("page_size", 20))
+
+        matches = [self.render(invoice) for invoice in self.invoices.values() if not statuses or self.status(invoice) in statuses]
+
+        return web.json_response({"total_count": len(matches), "invoices": matches[page:page + page_size]})
+
+    async def verify(self, request: web.Request) -> web.Response:
+        return web.json_response({"verification_status": "SUCCESS"})
+
+    async def force_pay(self, request: web.Request) -> web.Response:
+        invoice = self.invoices.get(request.match_info["id"])
+
+        if not invoice:
+            return web.Response(status=404)
+
+        invoice["status"] = "PAID"
+        return web.json_response(self.render(invoice))
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"calls": dict(self.calls), "errors": {str(status): count for status, count in self.errors.items()}, "invoices": len(self.invoices)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a fake PayPal invoicing API for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Random seconds added or removed from the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with a 429")
+    parser.add_argument("--pay-after", type=float, default=60, help="Average seconds between an invoice being sent and paid")
+    parser.add_argument("--pay-probability", type=float, default=0.5, help="Share of sent invoices that are eventually paid")
+    args = parser.parse_args()
+
+    fake = FakePayPal(args.latency, args.jitter, args.error_rate, args.rate_limit_rate, args.pay_after, args.pay_probability)
+    web.run_app(fake.app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import argparse
+import json
+import time
+import uuid
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+# Stands in for PayPal when testing the webhook receiver locally. Set VERIFY to false under
+# Invoice > WEBHOOK in config.yml, or point PAYPAL_BASE_URL at a fake PayPal that accepts
+# the signature check, since these events aren't signed by PayPal.
+#
+#   python tools/webhook_replay.py --invoice-id INV2-ABCD-1234
+#   python tools/webhook_replay.py --invoice-id INV2-ABCD-1234 --repeat 3 --save events.json
+#   python tools/webhook_replay.py --file events.json
+
+def paid_event(invoice_id: str) -> dict:
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        "id": f"WH-{uuid.uuid4().hex[:17].upper()}",
+        "event_version": "1.0",
+        "create_time": now,
+        "resource_type": "invoices",
+        "event_type": "INVOICING.INVOICE.PAID",
+        "summary": f"An invoice {invoice_id} has been paid",
+        "resource": {
+            "invoice": {
+                "id": invoice_id,
+                "status": "PAID",
+                "detail": {"metadata": {"last_update_time": now}},
+            }
+        },
+    }
+
+def deliver(url: str, event: dict) -> int:
+    request = urllib.request.Request(url, data=json.dumps(event).encode(), method="POST", headers={
+        "Content-Type": "application/json",
+        "PAYPAL-AUTH-ALGO": "SHA256withRSA",
+        "PAYPAL-CERT-URL": "https://api.sandbox.paypal.com/v1/notifications/certs/CERT-LOCAL",
+        "PAYPAL-TRANSMISSION-ID": str(uuid.uuid4()),
+        "PAYPAL-TRANSMISSION-SIG": "local",
+        "PAYPAL-TRANSMISSION-TIME": datetime.now(timezone.utc).isoformat(),
+    })
+
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays PayPal invoice webhook events against the local receiver.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/paypal/webhook", help="Webhook receiver URL")
+    parser.add_argument("--invoice-id", action="append", default=[], help="Send an INVOICING.INVOICE.PAID event for this invoice, can be repeated")
+    parser.add_argument("--file", help="Replay events saved as a JSON object or list")
+    parser.add_argument("--save", help="Write the generated events to this file so they can be replayed later")
+    parser.add_argument("--repeat", type=int, default=1, help="Deliver every event this many times, like PayPal redelivering")
+    parser.add_argument("--delay", type=float, default=0, help="Seconds to wait between deliveries")
+    args = parser.parse_args()
+
+    events = [paid_event(invoice_id) for invoice_id in args.invoice_id]
+
+    if args.file:
+        with open(args.file, "r") as file:
+            loaded = json.load(file)
+        events += loaded if isinstance(loaded, list) else [loaded]
+
+    if not events:
+        parser.error("nothing to send, pass --invoice-id or --file")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(events, file, indent=4)
+
+    for event in events:
+        for attempt in range(args.repeat):
+            started = time.perf_counter()
+            status = deliver(args.url, event)
+            print(f"{event['id']} {event['event_type']} #{attempt + 1}: {status} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+            if args.delay:
+                time.sleep(args.delay)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file